@@ -1,6 +1,7 @@
 """
 Flask Application Factory
 """
+import threading
 from flask import Flask
 from flask_cors import CORS
 
@@ -9,6 +10,10 @@ def create_app():
     """Create and configure Flask application"""
     app = Flask(__name__)
     
+    # Fast JSON serialization (orjson when installed)
+    from app.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
+    
     # Enable CORS for React frontend
     CORS(app, resources={
         r"/api/*": {
@@ -22,4 +27,14 @@ def create_app():
     from app.api.routes import api_bp
     app.register_blueprint(api_bp, url_prefix='/api/v1')
     
+    # Compress large responses (gzip/brotli)
+    from app.compression import init_compression
+    init_compression(app)
+    
+    # Load the LLM in the background so the first /match does not pay for it
+    from app.config import Config
+    if Config.LLM_WARMUP:
+        from app.api.routes import llm_matcher
+        threading.Thread(target=llm_matcher.warm_up, daemon=True).start()
+    
     return app
@@ -0,0 +1,84 @@
+"""
+Conditional GET support for read endpoints
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Optional
+
+from flask import request, make_response
+
+from app.utils.data_version import data_version
+
+
+def _etag_for(version: int) -> str:
+    """ETag for the current request path and query at a data version"""
+    digest = hashlib.md5(request.full_path.encode()).hexdigest()[:12]
+    return f'{version}-{digest}'
+
+
+def _not_modified(etag: str, last_modified: Optional[datetime]) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def _last_modified(modified: float) -> Optional[datetime]:
+    """
+    Whole-second Last-Modified, or None while that second is still current
+
+    HTTP dates have one-second resolution, so a date issued during the
+    second of the last write could not tell it apart from a later write in
+    the same second; until the second has passed only the ETag is used.
+    """
+    if int(modified) >= int(time.time()):
+        return None
+    return datetime.fromtimestamp(int(modified), tz=timezone.utc)
+
+
+def conditional(view):
+    """
+    Serve a read endpoint with ETag/Last-Modified validators.
+
+    A matching If-None-Match (or If-Modified-Since) is answered with 304
+    before the view runs, so unchanged data never reaches the database.
+    The ETag is weak (it names the data version, whatever the encoding)
+    and both the 200 and the 304 vary on Accept-Encoding, so the 304
+    carries the same validators and Vary as the response it revalidates.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version, modified = data_version.current()
+        etag = _etag_for(version)
+        last_modified = _last_modified(modified)
+
+        if _not_modified(etag, last_modified):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag, weak=True)
+        response.vary.add('Accept-Encoding')
+        if last_modified is not None:
+            response.last_modified = last_modified
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    return wrapper
+
+
+def bumps_data_version(view):
+    """Bump the shared data version after a successful write"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code < 400:
+            data_version.bump()
+        return response
+
+    return wrapper
@@ -2,17 +2,26 @@
 REST API Routes for Identity Unification System
 Phase 1: Deterministic Matching
 """
+from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify
-from app.database import get_db
+from app.database import IN_CHUNK_SIZE, PAGE_SIZE, get_db
 from app.matching.deterministic import DeterministicMatcher
 from app.utils.normalizers import normalize_email, normalize_phone, normalize_name
 from app.utils.validators import validate_identity_data
 from app.matching.fuzzy_matcher import FuzzyMatcher
 from app.matching.llm_matcher import LlmMatcher
+from app.matching.profile_merger import ProfileMerger
+from app.api.conditional import conditional, bumps_data_version
+from app.matching.deadline import Deadline
+from app.matching.admission import admission
+from app.matching.candidate_store import candidate_store
+from app.utils.profile_cache import profile_cache
+from app.config import Config
 
 llm_matcher = LlmMatcher()
 matcher = DeterministicMatcher()
 fuzzy_matcher = FuzzyMatcher()
+profile_merger = ProfileMerger()
 api_bp = Blueprint('api', __name__)
 db = get_db()
 matcher = DeterministicMatcher()
@@ -33,10 +42,61 @@ def health_check():
 
 # ==================== Profiles ====================
 
+def _parse_id_list(raw):
+    """Parse a comma-separated id list; returns None if malformed"""
+    try:
+        ids = [int(part) for part in raw.split(',') if part.strip()]
+    except ValueError:
+        return None
+    return list(dict.fromkeys(ids)) or None
+
+
 @api_bp.route('/profiles', methods=['GET'])
+@conditional
 def get_profiles():
-    """Get all unified profiles"""
+    """
+    Get all active unified profiles, or a batch by id
+    
+    Query params:
+        ids: comma-separated profile ids (e.g. ?ids=3,7,12), served from
+             the profile cache in request order; merged profiles forward
+             to their survivor as in GET /profiles/<id>, unknown ids are
+             listed under `missing`
+    """
     try:
+        if request.args.get('ids') is not None:
+            ids = _parse_id_list(request.args['ids'])
+            if ids is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'ids must be a comma-separated list of integers'
+                }), 400
+            if len(ids) > Config.PROFILE_BATCH_MAX:
+                return jsonify({
+                    'success': False,
+                    'error': f'At most {Config.PROFILE_BATCH_MAX} ids per request'
+                }), 400
+            
+            profiles = profile_cache.get_many(ids)
+            
+            # Merged profiles forward to their survivor (a single hop)
+            forwards = {
+                pid: profile['merged_into'] for pid, profile in profiles.items()
+                if profile.get('status') == 'merged' and profile.get('merged_into')
+            }
+            survivors = profile_cache.get_many(forwards.values()) if forwards else {}
+            for pid, survivor_id in forwards.items():
+                if survivor_id in survivors:
+                    profiles[pid] = {**survivors[survivor_id], 'forwarded_from': pid}
+            
+            data = [profiles[pid] for pid in ids if pid in profiles]
+            return jsonify({
+                'success': True,
+                'data': data,
+                'count': len(data),
+                'missing': [pid for pid in ids if pid not in profiles]
+            }), 200
+        
         response = db.table('unified_profiles') \
             .select('*, platform_identities(*)') \
             .eq('status', 'active') \
@@ -56,29 +116,27 @@ def get_profiles():
 
 
 @api_bp.route('/profiles/<int:profile_id>', methods=['GET'])
+@conditional
 def get_profile(profile_id):
     """Get specific profile with all linked identities"""
     try:
-        # Get profile
-        profile_response = db.table('unified_profiles') \
-            .select('*') \
-            .eq('id', profile_id) \
-            .execute()
+        # Profile and identities in one embedded query (or from the cache)
+        profile = profile_cache.get(profile_id)
         
-        if not profile_response.data:
+        if profile is None:
             return jsonify({
                 'success': False,
                 'error': 'Profile not found'
             }), 404
         
-        # Get linked identities
-        identities_response = db.table('platform_identities') \
-            .select('*') \
-            .eq('profile_id', profile_id) \
-            .execute()
+        # Merged profiles forward to their survivor (a single hop)
+        if profile.get('status') == 'merged' and profile.get('merged_into'):
+            survivor = profile_cache.get(profile['merged_into'])
+            if survivor is not None:
+                profile = survivor
+                profile['forwarded_from'] = profile_id
         
-        profile = profile_response.data[0]
-        profile['identities'] = identities_response.data
+        profile['identities'] = profile.pop('platform_identities', None) or []
         
         return jsonify({
             'success': True,
@@ -93,6 +151,7 @@ def get_profile(profile_id):
 
 
 @api_bp.route('/profiles', methods=['POST'])
+@bumps_data_version
 def create_profile():
     """Create new unified profile"""
     try:
@@ -124,9 +183,58 @@ def create_profile():
         }), 500
 
 
+@api_bp.route('/profiles/merge', methods=['POST'])
+@bumps_data_version
+def merge_profiles():
+    """
+    Merge groups of profiles into one survivor each
+    
+    Request body:
+    {
+        "groups": [
+            [12, 15],                                  # survivor chosen by strategy
+            {"profile_ids": [20, 21, 22], "survivor": 21}
+        ],
+        "strategy": "most_identities"                  # or "oldest"
+    }
+    """
+    try:
+        data = request.get_json() or {}
+        groups = data.get('groups')
+        
+        if not isinstance(groups, list) or not groups:
+            return jsonify({
+                'success': False,
+                'error': 'groups must be a non-empty list'
+            }), 400
+        
+        try:
+            results = profile_merger.merge(
+                groups, data.get('strategy', 'most_identities')
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'merged_count': sum(len(r['merged']) for r in results)
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 # ==================== Identities ====================
 
 @api_bp.route('/identities', methods=['GET'])
+@conditional
 def get_identities():
     """Get all platform identities"""
     try:
@@ -148,6 +256,7 @@ def get_identities():
 
 
 @api_bp.route('/identities', methods=['POST'])
+@bumps_data_version
 def add_identity():
     """
     Add new platform identity
@@ -217,6 +326,7 @@ def add_identity():
             'confidence_score': 1.0 if match_result else 0.0,
             'verified': bool(match_result)
         }).execute()
+        profile_cache.invalidate([profile_id])
         
         return jsonify({
             'success': True,
@@ -234,6 +344,34 @@ def add_identity():
 
 # ==================== Matching ====================
 
+def _match_response(matches, deadline, degraded=None):
+    """
+    /match response body; `partial` is set when a phase ran out of budget,
+    `degraded` names the phase skipped because it was saturated
+    """
+    return jsonify({
+        'success': True,
+        'matches': matches,
+        'match_count': len(matches),
+        'partial': deadline.partial,
+        'degraded': degraded
+    }), 200
+
+
+def _shed_response(phase, deadline):
+    """/match response when `phase` could not be admitted"""
+    if admission.overflow == 'degrade':
+        return _match_response([], deadline, degraded=phase)
+    
+    response = jsonify({
+        'success': False,
+        'error': f'Matching is busy ({phase} phase saturated), retry later',
+        'phase': phase
+    })
+    response.headers['Retry-After'] = str(admission.retry_after(phase))
+    return response, 429
+
+
 @api_bp.route('/match', methods=['POST'])
 def find_matches():
     try:
@@ -247,23 +385,36 @@ def find_matches():
         identifiers = data['identifiers']
         matches = []
 
+        # Optional latency budget: phases trim or skip work when it runs low
+        deadline_ms = data.get('deadline_ms', Config.MATCH_DEADLINE_MS)
+        if deadline_ms is not None and (
+            isinstance(deadline_ms, bool)
+            or not isinstance(deadline_ms, (int, float))
+            or deadline_ms < 0
+        ):
+            return jsonify({
+                'success': False,
+                'error': 'deadline_ms must be a non-negative number'
+            }), 400
+        deadline = Deadline(deadline_ms)
+
         # 1. Deterministic matching (stop/search here if found)
         for platform, identifier in identifiers.items():
             if not isinstance(identifier, str):
                 continue
+            if deadline.expired():
+                deadline.mark_partial('deterministic')
+                break
             result = matcher.find_exact_match(platform, identifier)
             if result:
                 matches.append(result)
 
         if matches:
             # Deterministic match found, return immediately
-            return jsonify({
-                'success': True,
-                'matches': matches,
-                'match_count': len(matches)
-            }), 200
+            return _match_response(matches, deadline)
 
         # 2. Fuzzy matching (only if *no* deterministic match)
+        # Every supplied identifier is scored in a single candidate pass
         first_platform = None
         first_id = None
         for p, ident in identifiers.items():
@@ -277,62 +428,69 @@ def find_matches():
             if not isinstance(display_name, str):
                 display_name = None
 
-            fuzzy_results = fuzzy_matcher.find_fuzzy_matches(
-                first_platform, first_id, display_name
-            )
+            with admission.admit('fuzzy', deadline.remaining()) as admitted:
+                if not admitted:
+                    return _shed_response('fuzzy', deadline)
+                fuzzy_results = fuzzy_matcher.find_multi_matches(
+                    identifiers, display_name, deadline=deadline
+                )
 
             if fuzzy_results:
                 # Fuzzy match found, return immediately
-                return jsonify({
-                    'success': True,
-                    'matches': fuzzy_results,
-                    'match_count': len(fuzzy_results)
-                }), 200
+                return _match_response(fuzzy_results, deadline)
 
         # 3. LLM matching (only if *no* deterministic or fuzzy match)
         low_confidence_threshold = 0.65
         # Use first identifier vs all profiles for LLM comparison
-        if first_platform and first_id:
-            first_name = data.get('display_name') if isinstance(data.get('display_name'), str) else None
-            db_client = get_db()
-            profiles_resp = db_client.table('platform_identities')\
-                .select('*, unified_profiles(canonical_name)')\
-                .execute()
-            candidates = profiles_resp.data if profiles_resp.data else []
-            for identity in candidates:
-                identity_data = {
-                    'platform': identity.get('platform'),
-                    'identifier': identity.get('identifier'),
-                    'display_name': identity.get('display_name') or identity.get('unified_profiles', {}).get('canonical_name')
-                }
-                source_identity = {
-                    'platform': first_platform,
-                    'identifier': first_id,
-                    'display_name': first_name
-                }
-                llm_result = llm_matcher.llm_match(source_identity, identity_data)
-                if llm_result and llm_result['is_match'] and llm_result['confidence'] >= low_confidence_threshold:
-                    matches.append({
-                        'profile_id': identity.get('profile_id'),
-                        'profile_name': identity.get('unified_profiles', {}).get('canonical_name'),
-                        'matched_identity': identity,
-                        'confidence': round(llm_result['confidence'], 2),
-                        'match_type': 'llm',
-                        'reasoning': llm_result.get('reasoning', '')
-                    })
+        if first_platform and first_id and deadline.expired():
+            deadline.mark_partial('llm')
+        elif first_platform and first_id:
+            with admission.admit('llm', deadline.remaining()) as admitted:
+                if not admitted:
+                    return _shed_response('llm', deadline)
+                first_name = data.get('display_name') if isinstance(data.get('display_name'), str) else None
+                if Config.CANDIDATE_STORE:
+                    candidates = candidate_store.view()
+                else:
+                    db_client = get_db()
+                    profiles_resp = db_client.table('platform_identities')\
+                        .select('*, unified_profiles(canonical_name)')\
+                        .execute()
+                    candidates = profiles_resp.data if profiles_resp.data else []
+                for identity in candidates:
+                    # Skip the remaining LLM calls once one no longer fits the budget
+                    if deadline.expired() or not deadline.allows(llm_matcher.expected_call_seconds):
+                        deadline.mark_partial('llm')
+                        break
+                    identity_data = {
+                        'platform': identity.get('platform'),
+                        'identifier': identity.get('identifier'),
+                        'display_name': identity.get('display_name') or identity.get('unified_profiles', {}).get('canonical_name')
+                    }
+                    source_identity = {
+                        'platform': first_platform,
+                        'identifier': first_id,
+                        'display_name': first_name
+                    }
+                    # A bounded call never outlives the request budget
+                    llm_result = llm_matcher.llm_match(
+                        source_identity, identity_data,
+                        timeout=min(Config.LLM_TIMEOUT_SECONDS, deadline.remaining())
+                    )
+                    if llm_result and llm_result['is_match'] and llm_result['confidence'] >= low_confidence_threshold:
+                        matches.append({
+                            'profile_id': identity.get('profile_id'),
+                            'profile_name': identity.get('unified_profiles', {}).get('canonical_name'),
+                            'matched_identity': identity,
+                            'confidence': round(llm_result['confidence'], 2),
+                            'match_type': 'llm',
+                            'reasoning': llm_result.get('reasoning', '')
+                        })
             if matches:
-                return jsonify({
-                    'success': True,
-                    'matches': matches,
-                    'match_count': len(matches)
-                }), 200
+                return _match_response(matches, deadline)
 
         # No match of any kind
-        return jsonify({
-            'success': True,
-            'matches': [],
-            'match_count': 0
-        }), 200
+        return _match_response([], deadline)
 
     except Exception as e:
         return jsonify({
@@ -343,9 +501,26 @@ def find_matches():
 
 
 
+@api_bp.route('/admission', methods=['GET'])
+def get_admission_stats():
+    """Slot usage, queue depth and rejection counters of the matching phases"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': admission.metrics()
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 # ==================== Match Candidates (Manual Review) ====================
 
 @api_bp.route('/candidates', methods=['GET'])
+@conditional
 def get_candidates():
     """Get all pending match candidates for review"""
     try:
@@ -370,25 +545,128 @@ def get_candidates():
         }), 500
 
 
-@api_bp.route('/candidates/<int:candidate_id>/approve', methods=['POST'])
-def approve_candidate(candidate_id):
-    """Approve a match candidate"""
-    try:
-        data = request.get_json() or {}
-        reviewed_by = data.get('reviewed_by', 'admin')
-        
-        response = db.table('match_candidates') \
+REVIEW_ACTIONS = {'approve': 'approved', 'reject': 'rejected'}
+
+
+def _review_candidates(action, reviewed_by, ids=None, filters=None):
+    """
+    Approve or reject match candidates with set-based writes
+    
+    Candidates are selected by id list (in chunks of IN_CHUNK_SIZE) or by
+    filter (status, min_confidence, match_type, read page by page), updated
+    with one `in` update per chunk, and on approval their source identities
+    are re-linked to the target profile in one batched upsert. Round trips
+    grow with the batch only by one per chunk or page.
+    
+    Returns: (per-id results, updated candidate rows)
+    """
+    new_status = REVIEW_ACTIONS[action]
+    
+    candidates = []
+    if ids is not None:
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            candidates.extend(
+                db.table('match_candidates')
+                .select('*, platform_identities(*)')
+                .in_('id', ids[start:start + IN_CHUNK_SIZE])
+                .execute().data or []
+            )
+    else:
+        start = 0
+        while True:
+            query = db.table('match_candidates') \
+                .select('*, platform_identities(*)') \
+                .eq('status', filters.get('status', 'pending'))
+            if filters.get('min_confidence') is not None:
+                query = query.gte('confidence_score', float(filters['min_confidence']))
+            if filters.get('match_type'):
+                query = query.eq('match_type', filters['match_type'])
+            page = query.order('id').range(start, start + PAGE_SIZE - 1).execute().data or []
+            candidates.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+    
+    found = {c['id']: c for c in candidates}
+    actionable = [c for c in candidates if c.get('status') != new_status]
+    
+    results = []
+    for candidate_id in (ids if ids is not None else list(found)):
+        candidate = found.get(candidate_id)
+        if candidate is None:
+            results.append({'id': candidate_id, 'result': 'not_found'})
+        elif candidate.get('status') == new_status:
+            results.append({'id': candidate_id, 'result': 'unchanged'})
+        else:
+            results.append({'id': candidate_id, 'result': new_status})
+    
+    if not actionable:
+        return results, []
+    
+    actionable_ids = [c['id'] for c in actionable]
+    updated = []
+    for start in range(0, len(actionable_ids), IN_CHUNK_SIZE):
+        updated.extend(
+            db.table('match_candidates')
             .update({
-                'status': 'approved',
+                'status': new_status,
                 'reviewed_by': reviewed_by,
                 'reviewed_at': 'now()'
-            }) \
-            .eq('id', candidate_id) \
-            .execute()
+            })
+            .in_('id', actionable_ids[start:start + IN_CHUNK_SIZE])
+            .execute().data or []
+        )
+    
+    if action == 'approve':
+        # One identity may appear in several candidates: keep the strongest
+        links = {}
+        for candidate in actionable:
+            identity = candidate.get('platform_identities')
+            if not identity or candidate.get('target_profile_id') is None:
+                continue
+            best = links.get(identity['id'])
+            if best is None or candidate.get('confidence_score', 0) > best.get('confidence_score', 0):
+                links[identity['id']] = candidate
+        
+        if links:
+            # With the candidate store on, set updated_at explicitly: the
+            # copied row carries the old value and its delta syncs key on it
+            stamp = {'updated_at': datetime.now(timezone.utc).isoformat()} if Config.CANDIDATE_STORE else {}
+            db.table('platform_identities').upsert([
+                {
+                    **candidate['platform_identities'],
+                    'profile_id': candidate['target_profile_id'],
+                    'confidence_score': candidate.get('confidence_score'),
+                    'verified': True,
+                    **stamp
+                }
+                for candidate in links.values()
+            ]).execute()
+            # Both the new and the previous profile of each identity changed
+            profile_cache.invalidate(
+                [c['target_profile_id'] for c in links.values()]
+                + [c['platform_identities'].get('profile_id') for c in links.values()]
+            )
+            
+            linked = {c['id']: c['platform_identities']['id'] for c in links.values()}
+            for result in results:
+                if result['id'] in linked:
+                    result['linked_identity_id'] = linked[result['id']]
+    
+    return results, updated
+
+
+def _review_one(candidate_id, action):
+    """Shared body of the single-candidate review endpoints"""
+    try:
+        data = request.get_json(silent=True) or {}
+        reviewed_by = data.get('reviewed_by', 'admin')
+        
+        _, updated = _review_candidates(action, reviewed_by, ids=[candidate_id])
         
         return jsonify({
             'success': True,
-            'data': response.data[0] if response.data else None
+            'data': updated[0] if updated else None
         }), 200
     
     except Exception as e:
@@ -398,25 +676,92 @@ def approve_candidate(candidate_id):
         }), 500
 
 
+@api_bp.route('/candidates/<int:candidate_id>/approve', methods=['POST'])
+@bumps_data_version
+def approve_candidate(candidate_id):
+    """Approve a match candidate and link its identity to the target profile"""
+    return _review_one(candidate_id, 'approve')
+
+
 @api_bp.route('/candidates/<int:candidate_id>/reject', methods=['POST'])
+@bumps_data_version
 def reject_candidate(candidate_id):
     """Reject a match candidate"""
+    return _review_one(candidate_id, 'reject')
+
+
+@api_bp.route('/candidates/bulk', methods=['POST'])
+@bumps_data_version
+def bulk_review_candidates():
+    """
+    Approve or reject many match candidates at once
+    
+    Request body:
+    {
+        "action": "approve",                 # or "reject"
+        "ids": [1, 2, 3],                    # either explicit ids...
+        "filter": {                          # ...or a filter
+            "status": "pending",
+            "min_confidence": 0.8,
+            "match_type": "fuzzy"
+        },
+        "reviewed_by": "admin"
+    }
+    """
     try:
         data = request.get_json() or {}
-        reviewed_by = data.get('reviewed_by', 'admin')
+        action = data.get('action')
+        ids = data.get('ids')
+        filters = data.get('filter')
         
-        response = db.table('match_candidates') \
-            .update({
-                'status': 'rejected',
-                'reviewed_by': reviewed_by,
-                'reviewed_at': 'now()'
-            }) \
-            .eq('id', candidate_id) \
-            .execute()
+        if action not in REVIEW_ACTIONS:
+            return jsonify({
+                'success': False,
+                'error': f"action must be one of: {', '.join(REVIEW_ACTIONS)}"
+            }), 400
+        
+        if (ids is None) == (filters is None):
+            return jsonify({
+                'success': False,
+                'error': 'Provide exactly one of ids or filter'
+            }), 400
+        
+        if ids is not None and (
+            not isinstance(ids, list)
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)
+        ):
+            return jsonify({
+                'success': False,
+                'error': 'ids must be a list of integers'
+            }), 400
+        
+        if filters is not None and not isinstance(filters, dict):
+            return jsonify({
+                'success': False,
+                'error': 'filter must be an object'
+            }), 400
+        
+        min_confidence = (filters or {}).get('min_confidence')
+        if min_confidence is not None and (
+            isinstance(min_confidence, bool)
+            or not isinstance(min_confidence, (int, float))
+        ):
+            return jsonify({
+                'success': False,
+                'error': 'filter.min_confidence must be a number'
+            }), 400
+        
+        results, updated = _review_candidates(
+            action,
+            data.get('reviewed_by', 'admin'),
+            ids=list(dict.fromkeys(ids)) if ids is not None else None,
+            filters=filters
+        )
         
         return jsonify({
             'success': True,
-            'data': response.data[0] if response.data else None
+            'results': results,
+            'updated_count': len(updated)
         }), 200
     
     except Exception as e:
@@ -429,6 +774,7 @@ def reject_candidate(candidate_id):
 # ==================== Statistics ====================
 
 @api_bp.route('/stats', methods=['GET'])
+@conditional
 def get_stats():
     """Get system statistics"""
     try:
@@ -0,0 +1,58 @@
+"""
+Response compression negotiated on Accept-Encoding
+"""
+import gzip
+
+from flask import Flask, request, Response
+
+from app.config import Config
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoder
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/csv'}
+
+
+def _choose_encoding() -> str:
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered) or ''
+
+
+def compress_response(response: Response) -> Response:
+    """Compress eligible responses above COMPRESSION_MIN_BYTES"""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < Config.COMPRESSION_MIN_BYTES:
+        return response
+
+    encoding = _choose_encoding()
+    if encoding == 'br':
+        body = brotli.compress(body, quality=Config.BROTLI_QUALITY)
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=Config.GZIP_LEVEL)
+    else:
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app: Flask):
+    """Register response compression on the application"""
+    app.after_request(compress_response)
@@ -2,6 +2,7 @@
 Configuration settings for the application
 """
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -26,3 +27,85 @@ class Config:
     HIGH_CONFIDENCE_THRESHOLD = 0.85
     MEDIUM_CONFIDENCE_THRESHOLD = 0.65
     LOW_CONFIDENCE_THRESHOLD = 0.50
+    
+    # Fuzzy candidate generation (character n-gram TF-IDF index)
+    FUZZY_INDEX_MIN_ROWS = int(os.getenv('FUZZY_INDEX_MIN_ROWS', 5000))
+    FUZZY_TOP_K = int(os.getenv('FUZZY_TOP_K', 200))
+    FUZZY_INDEX_PATH = os.getenv('FUZZY_INDEX_PATH')
+    # Seconds between background saves of a changed index to FUZZY_INDEX_PATH
+    FUZZY_INDEX_SAVE_INTERVAL = float(os.getenv('FUZZY_INDEX_SAVE_INTERVAL', 60))
+    
+    # HTTP caching: shared data-version file backing ETags on read endpoints
+    DATA_VERSION_PATH = os.getenv(
+        'DATA_VERSION_PATH',
+        os.path.join(tempfile.gettempdir(), 'identity-data-version')
+    )
+    
+    # Response compression
+    COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+    GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+    BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+    
+    # Shared memory-mapped identity snapshot (built on gunicorn start or by
+    # `python -m app.matching.snapshot build`). One worker rebuilds it
+    # every SNAPSHOT_REBUILD_INTERVAL seconds when writes have bumped the
+    # data version since it was read, so fuzzy matches lag writes by up to
+    # that interval plus the rebuild and SNAPSHOT_CHECK_INTERVAL. With 0,
+    # schedule the build command yourself (writes outside the API, which
+    # do not bump the version, also need it)
+    SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR')
+    SNAPSHOT_CHECK_INTERVAL = float(os.getenv('SNAPSHOT_CHECK_INTERVAL', 5))
+    SNAPSHOT_REBUILD_INTERVAL = float(os.getenv('SNAPSHOT_REBUILD_INTERVAL', 30))
+    
+    # Sharded fuzzy scoring: number of persistent scoring processes per
+    # worker (0 = score in-process)
+    FUZZY_SHARDS = int(os.getenv('FUZZY_SHARDS', 0))
+    
+    # Candidate store for the fuzzy and LLM phases: loaded once, then
+    # refreshed with the rows changed since a created_at/updated_at
+    # watermark. Requires both columns on platform_identities and
+    # unified_profiles, with updated_at advanced on every update (run
+    # migrations/001_sync_columns.sql first). Off by
+    # default: each worker keeps a full copy of the table, where the
+    # SNAPSHOT_DIR snapshot is shared between workers (see CandidateStore)
+    CANDIDATE_STORE = os.getenv('CANDIDATE_STORE', '0') == '1'
+    CANDIDATE_REFRESH_INTERVAL = float(os.getenv('CANDIDATE_REFRESH_INTERVAL', 5))
+    CANDIDATE_SYNC_OVERLAP = float(os.getenv('CANDIDATE_SYNC_OVERLAP', 5))
+    CANDIDATE_RECONCILE_INTERVAL = float(os.getenv('CANDIDATE_RECONCILE_INTERVAL', 300))
+    CANDIDATE_LOG_SIZE = int(os.getenv('CANDIDATE_LOG_SIZE', 50000))
+    
+    # Default /match latency budget in milliseconds (0 = no deadline)
+    MATCH_DEADLINE_MS = float(os.getenv('MATCH_DEADLINE_MS', 0))
+    
+    # Admission control for the fuzzy and LLM /match phases: concurrent
+    # slots shared by all workers (0 = unlimited), a bounded wait queue, and
+    # what to do when saturated ('reject' = 429 + Retry-After, 'degrade' =
+    # answer with the deterministic result only)
+    ADMISSION_DIR = os.getenv(
+        'ADMISSION_DIR',
+        os.path.join(tempfile.gettempdir(), 'identity-admission')
+    )
+    ADMISSION_FUZZY_SLOTS = int(os.getenv('ADMISSION_FUZZY_SLOTS', 4))
+    ADMISSION_LLM_SLOTS = int(os.getenv('ADMISSION_LLM_SLOTS', 2))
+    ADMISSION_QUEUE = int(os.getenv('ADMISSION_QUEUE', 8))
+    ADMISSION_MAX_WAIT_MS = float(os.getenv('ADMISSION_MAX_WAIT_MS', 2000))
+    ADMISSION_OVERFLOW = os.getenv('ADMISSION_OVERFLOW', 'reject')
+    
+    # Profile cache (profiles with identities); write routes log the profile
+    # ids they touch to a file shared by all workers, which evict just those
+    PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 10000))
+    PROFILE_CACHE_TTL = float(os.getenv('PROFILE_CACHE_TTL', 60))
+    PROFILE_INVALIDATION_PATH = os.getenv(
+        'PROFILE_INVALIDATION_PATH',
+        os.path.join(tempfile.gettempdir(), 'identity-profile-invalidations')
+    )
+    PROFILE_BATCH_MAX = int(os.getenv('PROFILE_BATCH_MAX', 200))
+    
+    # LLM (Ollama)
+    OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+    OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'gemma2:2b')
+    OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+    LLM_NUM_PREDICT = int(os.getenv('LLM_NUM_PREDICT', 96))
+    LLM_REASONING_WORDS = int(os.getenv('LLM_REASONING_WORDS', 15))
+    LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', 30))
+    LLM_WARMUP = os.getenv('LLM_WARMUP', '1') == '1'
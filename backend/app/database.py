@@ -4,6 +4,12 @@ Supabase database client initialization
 from supabase import create_client, Client
 from app.config import Config
 
+# PostgREST caps every response at db-max-rows (1000 on Supabase), so
+# larger reads are paged
+PAGE_SIZE = 1000
+# Ids per `in` filter; the list travels in the request URL
+IN_CHUNK_SIZE = 500
+
 
 class SupabaseClient:
     """Singleton Supabase client"""
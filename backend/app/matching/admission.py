@@ -0,0 +1,241 @@
+"""
+Admission control for the expensive matching phases (fuzzy, LLM)
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+import math
+import os
+import random
+import threading
+import time
+
+from app.config import Config
+from app.utils import file_lock
+
+POLL_INITIAL_SECONDS = 0.002
+POLL_MAX_SECONDS = 0.05
+
+
+class PhaseAdmission:
+    """
+    Concurrency limit for one matching phase, shared by all workers.
+
+    Every slot is a lock file in a shared directory, held with an
+    exclusive flock while a request runs the phase, so the limit holds
+    across gunicorn workers and a crashed worker releases its slots with
+    its file descriptors. Requests that find every slot busy take a queue
+    ticket (another set of lock files, bounding the wait queue) and poll
+    for a slot until their wait budget runs out; with no ticket left they
+    are turned away immediately. Waiters are not served in strict FIFO
+    order.
+
+    Counters are kept per worker process; slot and queue occupancy is
+    read from the lock files and covers all workers.
+    """
+
+    def __init__(self, phase: str, slots: int, queue_size: int, max_wait_ms: float, directory: str):
+        self.phase = phase
+        self.slots = slots
+        self.queue_size = queue_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.directory = directory
+        self._slot_paths = self._paths('slot', slots)
+        self._queue_paths = self._paths('queue', queue_size)
+        self._lock = threading.Lock()
+        self._counters = {
+            'admitted': 0,
+            'queued': 0,
+            'rejected_queue_full': 0,
+            'rejected_wait_timeout': 0,
+        }
+        self._waiting = 0
+        self._running = 0
+        self._avg_wait = 0.0
+        self._avg_hold = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.slots > 0
+
+    def _paths(self, kind: str, count: int) -> List[str]:
+        return [os.path.join(self.directory, f'{self.phase}-{kind}-{i}.lock') for i in range(count)]
+
+    @staticmethod
+    def _try_lock(paths: List[str]) -> Optional[int]:
+        """Hold the first free lock file of `paths` (random start spreads contention)"""
+        if not paths:
+            return None
+        start = random.randrange(len(paths))
+        for path in paths[start:] + paths[:start]:
+            fd = file_lock.open_lock_file(path)
+            if file_lock.lock(fd, blocking=False):
+                return fd
+            os.close(fd)
+        return None
+
+    @staticmethod
+    def _count_held(paths: List[str]) -> int:
+        """Lock files currently held by any process (a brief shared-lock probe)"""
+        held = 0
+        for path in paths:
+            fd = file_lock.open_lock_file(path)
+            if file_lock.lock(fd, blocking=False, shared=True):
+                file_lock.release(fd)
+            else:
+                held += 1
+                os.close(fd)
+        return held
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    @staticmethod
+    def _ema(average: float, sample: float) -> float:
+        return sample if not average else 0.8 * average + 0.2 * sample
+
+    def _wait_for_slot(self, max_wait: float) -> Optional[int]:
+        ticket = self._try_lock(self._queue_paths)
+        if ticket is None:
+            self._count('rejected_queue_full')
+            return None
+
+        self._count('queued')
+        with self._lock:
+            self._waiting += 1
+        try:
+            started = time.monotonic()
+            delay = POLL_INITIAL_SECONDS
+            while True:
+                remaining = max_wait - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._count('rejected_wait_timeout')
+                    return None
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, POLL_MAX_SECONDS)
+                slot = self._try_lock(self._slot_paths)
+                if slot is not None:
+                    return slot
+        finally:
+            with self._lock:
+                self._waiting -= 1
+            file_lock.release(ticket)
+
+    @contextmanager
+    def admit(self, max_wait: Optional[float] = None) -> Iterator[bool]:
+        """
+        Run the phase under a slot if one frees up in time
+
+        Args:
+            max_wait: seconds this request may queue (capped at the
+                configured maximum; e.g. the request's remaining deadline)
+
+        Yields: True when admitted (the slot is held until the block
+            exits), False when the phase should be shed
+        """
+        if not self.enabled:
+            yield True
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        max_wait = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+        started = time.monotonic()
+
+        slot = self._try_lock(self._slot_paths)
+        if slot is None and max_wait > 0:
+            slot = self._wait_for_slot(max_wait)
+        elif slot is None:
+            self._count('rejected_queue_full' if not self.queue_size else 'rejected_wait_timeout')
+
+        if slot is None:
+            yield False
+            return
+
+        admitted_at = time.monotonic()
+        with self._lock:
+            self._counters['admitted'] += 1
+            self._running += 1
+            self._avg_wait = self._ema(self._avg_wait, admitted_at - started)
+        try:
+            yield True
+        finally:
+            file_lock.release(slot)
+            with self._lock:
+                self._running -= 1
+                self._avg_hold = self._ema(self._avg_hold, time.monotonic() - admitted_at)
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait: queued work over the slots, at least 1"""
+        with self._lock:
+            backlog = (self._waiting + self._running + 1) / max(self.slots, 1)
+            return max(1, math.ceil(self._avg_hold * backlog))
+
+    def metrics(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {'enabled': False}
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            counters = dict(self._counters)
+            local = {
+                'waiting': self._waiting,
+                'running': self._running,
+                'avg_wait_ms': round(self._avg_wait * 1000, 1),
+                'avg_hold_ms': round(self._avg_hold * 1000, 1),
+            }
+        return {
+            'enabled': True,
+            'slots': self.slots,
+            'queue_size': self.queue_size,
+            'max_wait_ms': round(self.max_wait * 1000),
+            'slots_in_use': self._count_held(self._slot_paths),
+            'queue_depth': self._count_held(self._queue_paths),
+            'worker': {'pid': os.getpid(), **local, **counters},
+        }
+
+
+class AdmissionController:
+    """Per-phase admission for the fuzzy and LLM matching phases"""
+
+    def __init__(self, directory: str, limits: Dict[str, Dict[str, float]], overflow: str = 'reject'):
+        self.overflow = overflow
+        self.phases = {
+            phase: PhaseAdmission(
+                phase,
+                int(limit['slots']),
+                int(limit['queue']),
+                float(limit['max_wait_ms']),
+                directory,
+            )
+            for phase, limit in limits.items()
+        }
+
+    def admit(self, phase: str, max_wait: Optional[float] = None):
+        return self.phases[phase].admit(max_wait)
+
+    def retry_after(self, phase: str) -> int:
+        return self.phases[phase].retry_after()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'overflow': self.overflow,
+            'phases': {phase: admission.metrics() for phase, admission in self.phases.items()},
+        }
+
+
+admission = AdmissionController(
+    Config.ADMISSION_DIR,
+    {
+        'fuzzy': {
+            'slots': Config.ADMISSION_FUZZY_SLOTS,
+            'queue': Config.ADMISSION_QUEUE,
+            'max_wait_ms': Config.ADMISSION_MAX_WAIT_MS,
+        },
+        'llm': {
+            'slots': Config.ADMISSION_LLM_SLOTS,
+            'queue': Config.ADMISSION_QUEUE,
+            'max_wait_ms': Config.ADMISSION_MAX_WAIT_MS,
+        },
+    },
+    Config.ADMISSION_OVERFLOW,
+)
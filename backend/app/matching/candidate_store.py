@@ -0,0 +1,346 @@
+"""
+In-memory candidate identities for the fuzzy and LLM matching phases
+"""
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import os
+import threading
+import time
+
+from app.config import Config
+from app.database import IN_CHUNK_SIZE, PAGE_SIZE
+from app.utils.data_version import data_version
+from .snapshot import fetch_identities
+
+IDENTITY_COLUMNS = '*, unified_profiles(canonical_name)'
+PROFILE_COLUMNS = 'id, canonical_name'
+
+
+class CandidateView(list):
+    """
+    Candidate identities at one store version.
+
+    A list of identity rows (shared between requests, so read-only) with
+    lookup by id, plus the store's change log up to this version so that
+    indexes built over an older version can be patched instead of rebuilt.
+    """
+
+    def __init__(
+        self,
+        rows: Dict[int, Dict[str, Any]],
+        version: int,
+        log: Tuple[Tuple[int, frozenset], ...],
+        log_floor: int,
+    ):
+        super().__init__(rows.values())
+        self.by_id = rows
+        self.version = version
+        self._log = log
+        self._log_floor = log_floor
+
+    def get(self, row_id: int, default=None) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(row_id, default)
+
+    def changes_since(self, version: Any) -> Optional[Set[int]]:
+        """
+        Ids of the rows added, changed or tombstoned after `version`
+
+        Returns: None when the change log no longer reaches back to
+            `version` (or it is not a version of this store)
+        """
+        if not isinstance(version, int) or not self._log_floor <= version <= self.version:
+            return None
+        changed: Set[int] = set()
+        for entry_version, row_ids in reversed(self._log):
+            if entry_version <= version:
+                break
+            changed.update(row_ids)
+        return changed
+
+
+class CandidateStore:
+    """
+    Identity rows loaded once per worker and kept current with deltas.
+
+    The first read loads the whole table with the same columns as a
+    per-request read, so `matched_identity` always has the full row. Every
+    later refresh fetches only
+    identities and profiles whose created_at/updated_at is at or past the
+    watermark of the previous refresh, less CANDIDATE_SYNC_OVERLAP seconds
+    to cover clock skew and late commits; refetched rows that did not
+    change are ignored. Profile renames patch the canonical name of their
+    identities, and an identity re-linked to another profile replaces its
+    old version.
+
+    Deltas rely on `created_at` and `updated_at` columns on both
+    platform_identities and unified_profiles, with `updated_at` advanced
+    on every update: run migrations/001_sync_columns.sql before enabling
+    the store. The API's own writes set it explicitly while the store is
+    on; the migration's `BEFORE UPDATE` trigger covers writes made outside
+    the API, which are otherwise only seen by the reconcile scan.
+
+    Rows deleted from the table are found by a scan of ids and profile ids
+    every CANDIDATE_RECONCILE_INTERVAL seconds, which also reloads rows a
+    delta missed and identities re-linked without an updated_at change.
+    Replaced and deleted rows are recorded in the change log as
+    tombstones, and indexes retire their entries for them.
+
+    Refreshes run every CANDIDATE_REFRESH_INTERVAL seconds in a background
+    thread, and on demand when the shared data version moves, so a write
+    through any worker is visible to the next request. Each refresh
+    publishes a new immutable view; requests never see a half-applied
+    delta.
+
+    The trade-off is memory: every worker holds its own copy of the table,
+    and a refresh that changed rows publishes a new view (a shallow copy of
+    the row index; row dicts are shared, and the previous view is freed
+    once no request holds it). Where the table is large and workers are
+    many, the shared memory-mapped snapshot (SNAPSHOT_DIR) with the store
+    disabled uses far less memory, at the cost of snapshot staleness and
+    slim snapshot rows.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float,
+        overlap: float,
+        reconcile_interval: float,
+        log_size: int,
+    ):
+        self.refresh_interval = refresh_interval
+        self.overlap = timedelta(seconds=overlap)
+        self.reconcile_interval = reconcile_interval
+        self.log_size = log_size
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        self._members: Dict[Any, Set[int]] = {}
+        self._view: Optional[CandidateView] = None
+        self._version = 0
+        self._log: deque = deque()
+        self._log_rows = 0
+        self._log_floor = 0
+        self._watermark: Optional[datetime] = None
+        self._data_version = None
+        self._reconciled_at = 0.0
+        self._lock = threading.Lock()
+        self._timer_lock = threading.Lock()
+        self._timer_pid = None
+        self._db = None
+        self.stats = {
+            'full_loads': 0,
+            'refreshes': 0,
+            'rows_fetched': 0,
+            'rows_changed': 0,
+            'tombstones': 0,
+        }
+
+    @property
+    def db(self):
+        if self._db is None:
+            from app.database import get_db
+            self._db = get_db()
+        return self._db
+
+    def view(self) -> CandidateView:
+        """Current candidates, refreshed first if the shared data version moved"""
+        self._start_timer()
+        if self._view is not None and not self._stale():
+            return self._view
+
+        try:
+            with self._lock:
+                if self._view is None or self._stale():
+                    self._refresh()
+        except Exception as e:
+            if self._view is None:
+                raise
+            print(f"Error refreshing candidate store: {str(e)}")
+        return self._view
+
+    def refresh(self, reconcile: bool = False) -> CandidateView:
+        """
+        Bring the store up to date now
+
+        Args:
+            reconcile: also scan the table ids for deleted rows
+        """
+        with self._lock:
+            self._refresh(reconcile)
+        return self._view
+
+    def _stale(self) -> bool:
+        return data_version.current()[0] != self._data_version
+
+    def _refresh(self, reconcile: bool = False):
+        version, _ = data_version.current()
+        started = datetime.now(timezone.utc)
+
+        if self._watermark is None:
+            self._load()
+        else:
+            changed = self._fetch_delta(self._watermark - self.overlap)
+            if reconcile or time.monotonic() - self._reconciled_at >= self.reconcile_interval:
+                changed |= self._reconcile()
+            self._publish(changed)
+            self.stats['refreshes'] += 1
+
+        self._watermark = started
+        self._data_version = version
+
+    def _load(self):
+        """Full load of the table"""
+        self._rows = {}
+        self._members = {}
+        rows = fetch_identities(self.db, IDENTITY_COLUMNS)
+        self.stats['rows_fetched'] += len(rows)
+        for row in rows:
+            self._put(row)
+        self._reconciled_at = time.monotonic()
+
+        self._version += 1
+        self._log.clear()
+        self._log_rows = 0
+        self._log_floor = self._version
+        self._view = CandidateView(dict(self._rows), self._version, (), self._log_floor)
+        self.stats['full_loads'] += 1
+
+    def _fetch_delta(self, since: datetime) -> Set[int]:
+        """Apply identities and profile names changed since `since`; returns changed row ids"""
+        stamp = since.isoformat(timespec='microseconds')
+        window = f'created_at.gte.{stamp},updated_at.gte.{stamp}'
+
+        changed: Set[int] = set()
+        for row in self._fetch_pages('platform_identities', IDENTITY_COLUMNS, window):
+            if self._put(row):
+                changed.add(row['id'])
+        for profile in self._fetch_pages('unified_profiles', PROFILE_COLUMNS, window):
+            changed |= self._rename(profile['id'], profile.get('canonical_name'))
+        return changed
+
+    def _reconcile(self) -> Set[int]:
+        """
+        Tombstone rows no longer in the table, and reload rows a delta
+        missed or that were re-linked without touching updated_at
+        """
+        live: Dict[int, Any] = {}
+        start = 0
+        while True:
+            page = self.db.table('platform_identities') \
+                .select('id, profile_id') \
+                .order('id') \
+                .range(start, start + PAGE_SIZE - 1) \
+                .execute().data or []
+            live.update((row['id'], row.get('profile_id')) for row in page)
+            if len(page) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+
+        removed = set(self._rows) - live.keys()
+        for row_id in removed:
+            self._remove(row_id)
+
+        missing = sorted(
+            row_id for row_id, profile_id in live.items()
+            if row_id not in self._rows or self._rows[row_id].get('profile_id') != profile_id
+        )
+        for start in range(0, len(missing), IN_CHUNK_SIZE):
+            rows = self.db.table('platform_identities') \
+                .select(IDENTITY_COLUMNS) \
+                .in_('id', missing[start:start + IN_CHUNK_SIZE]) \
+                .execute().data or []
+            self.stats['rows_fetched'] += len(rows)
+            for row in rows:
+                self._put(row)
+
+        self._reconciled_at = time.monotonic()
+        return removed | set(missing)
+
+    def _fetch_pages(self, table: str, columns: str, window: str) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            page = self.db.table(table) \
+                .select(columns) \
+                .or_(window) \
+                .order('id') \
+                .range(start, start + PAGE_SIZE - 1) \
+                .execute().data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+        self.stats['rows_fetched'] += len(rows)
+        return rows
+
+    def _put(self, row: Dict[str, Any]) -> bool:
+        """Insert or replace a row; False when it is unchanged"""
+        row_id = row.get('id')
+        if row_id is None:
+            return False
+        old = self._rows.get(row_id)
+        if old == row:
+            return False
+        if old is not None:
+            self._members.get(old.get('profile_id'), set()).discard(row_id)
+        self._rows[row_id] = row
+        self._members.setdefault(row.get('profile_id'), set()).add(row_id)
+        return True
+
+    def _remove(self, row_id: int):
+        old = self._rows.pop(row_id, None)
+        if old is not None:
+            self._members.get(old.get('profile_id'), set()).discard(row_id)
+            self.stats['tombstones'] += 1
+
+    def _rename(self, profile_id: Any, canonical_name: Optional[str]) -> Set[int]:
+        """Patch the canonical name on the identities of a profile"""
+        changed: Set[int] = set()
+        for row_id in self._members.get(profile_id, ()):
+            row = self._rows[row_id]
+            embedded = row.get('unified_profiles') or {}
+            if embedded.get('canonical_name') != canonical_name:
+                self._rows[row_id] = {**row, 'unified_profiles': {**embedded, 'canonical_name': canonical_name}}
+                changed.add(row_id)
+        return changed
+
+    def _publish(self, changed: Iterable[int]):
+        """Publish a new view recording `changed` in the change log"""
+        changed = frozenset(changed)
+        if not changed:
+            return
+
+        self._version += 1
+        self._log.append((self._version, changed))
+        self._log_rows += len(changed)
+        while self._log_rows > self.log_size and len(self._log) > 1:
+            floor_version, row_ids = self._log.popleft()
+            self._log_rows -= len(row_ids)
+            self._log_floor = floor_version
+        self._view = CandidateView(dict(self._rows), self._version, tuple(self._log), self._log_floor)
+        self.stats['rows_changed'] += len(changed)
+
+    def _start_timer(self):
+        """Start the background refresh once per process (threads do not survive a fork)"""
+        if self.refresh_interval <= 0 or self._timer_pid == os.getpid():
+            return
+        with self._timer_lock:
+            if self._timer_pid == os.getpid():
+                return
+            self._timer_pid = os.getpid()
+            threading.Thread(target=self._run_timer, daemon=True).start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing candidate store: {str(e)}")
+
+
+candidate_store = CandidateStore(
+    Config.CANDIDATE_REFRESH_INTERVAL,
+    Config.CANDIDATE_SYNC_OVERLAP,
+    Config.CANDIDATE_RECONCILE_INTERVAL,
+    Config.CANDIDATE_LOG_SIZE,
+)
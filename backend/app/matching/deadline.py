@@ -0,0 +1,46 @@
+"""
+Per-request latency budget shared by the matching phases
+"""
+from typing import List, Optional
+import time
+
+
+class Deadline:
+    """
+    Remaining time budget for one match request.
+
+    Phases consult the budget before expensive work, trim or stop when it
+    runs low, and record themselves with `mark_partial` so the response
+    can be flagged as a partial result. A deadline without a budget never
+    expires.
+    """
+
+    def __init__(self, budget_ms: Optional[float] = None):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000.0 if budget_ms else None
+        self.partial_phases: List[str] = []
+
+    @property
+    def bounded(self) -> bool:
+        return self.expires_at is not None
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.partial_phases)
+
+    def remaining(self) -> float:
+        """Seconds left in the budget (infinite when unbounded)"""
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def allows(self, seconds: float) -> bool:
+        """Whether work expected to take `seconds` fits in the remaining budget"""
+        return self.remaining() >= seconds
+
+    def mark_partial(self, phase: str):
+        if phase not in self.partial_phases:
+            self.partial_phases.append(phase)
@@ -37,7 +37,8 @@ class DeterministicMatcher:
             return None
         
         try:
-            # Query platform_identities table
+            # Query platform_identities table; one round trip with the
+            # linked profile embedded
             response = self.db.table('platform_identities') \
                 .select('*, unified_profiles(*)') \
                 .eq('platform', platform) \
@@ -51,7 +52,7 @@ class DeterministicMatcher:
                     'confidence': 1.0,
                     'match_type': 'deterministic',
                     'profile_id': identity.get('profile_id'),
-                    'profile_name': identity.get('unified_profiles', {}).get('canonical_name'),
+                    'profile_name': (identity.get('unified_profiles') or {}).get('canonical_name'),
                     'matched_identity': identity
                 }
         
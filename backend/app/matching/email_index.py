@@ -0,0 +1,94 @@
+"""
+Email index for alias resolution and blocking in fuzzy matching
+"""
+from collections import defaultdict
+from typing import Dict, Any, Iterable, Optional, Set, Tuple
+
+from app.utils.normalizers import canonicalize_email
+
+
+class EmailIndex:
+    """
+    Lookup index over email addresses.
+
+    Addresses are keyed by canonical address, canonical local part and
+    domain. Aliases (plus-addressing, Gmail dots, googlemail.com) resolve
+    with a single dictionary lookup, and only identities sharing the local
+    part or the domain are handed on to similarity scoring.
+    """
+
+    ALIAS_SCORE = 0.95
+    # Same local part at another domain; the domain similarity only adds
+    # up to DOMAIN_BONUS on top
+    SAME_LOCAL_SCORE = 0.8
+    DOMAIN_BONUS = 0.1
+
+    def __init__(self):
+        self.keys: Dict[int, Tuple[str, str]] = {}
+        self.by_address: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+        self.by_local: Dict[str, Set[int]] = defaultdict(set)
+        self.by_domain: Dict[str, Set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, row_id: int) -> bool:
+        return row_id in self.keys
+
+    def add(self, row_id: int, email: Optional[str]) -> bool:
+        """Index an email address under `row_id`"""
+        keys = canonicalize_email(email)
+        if keys is None:
+            return False
+
+        self.keys[row_id] = keys
+        local, domain = keys
+        self.by_address[keys].add(row_id)
+        self.by_local[local].add(row_id)
+        self.by_domain[domain].add(row_id)
+        return True
+
+    def remove(self, row_id: int) -> bool:
+        """Drop the address indexed under `row_id`"""
+        keys = self.keys.pop(row_id, None)
+        if keys is None:
+            return False
+
+        local, domain = keys
+        for buckets, key in ((self.by_address, keys), (self.by_local, local), (self.by_domain, domain)):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.discard(row_id)
+                if not bucket:
+                    del buckets[key]
+        return True
+
+    def add_identities(self, identities: Iterable[Dict[str, Any]]) -> int:
+        """Index every identity whose identifier looks like an email address"""
+        added = 0
+        for identity in identities:
+            identifier = identity.get('identifier')
+            if identity.get('id') is not None and isinstance(identifier, str) and '@' in identifier:
+                added += self.add(identity['id'], identifier)
+        return added
+
+    def canonical_keys(self, row_id: int) -> Optional[Tuple[str, str]]:
+        """(local part, domain) indexed under `row_id`"""
+        return self.keys.get(row_id)
+
+    def lookup(self, email: str) -> Tuple[Set[int], Set[int], Set[int]]:
+        """
+        Split indexed identities into blocks relative to `email`
+
+        Returns: (aliases, same_local_part, same_domain) row id sets; rows
+        in an earlier set are excluded from the later ones
+        """
+        keys = canonicalize_email(email)
+        if keys is None:
+            return set(), set(), set()
+
+        local, domain = keys
+        aliases = set(self.by_address.get(keys, ()))
+        same_local = set(self.by_local.get(local, ())) - aliases
+        same_domain = set(self.by_domain.get(domain, ())) - aliases - same_local
+        return aliases, same_local, same_domain
@@ -1,12 +1,42 @@
 """
 Phase 2: Fuzzy Matching Logic using RapidFuzz and Phonetics
 """
-from typing import Optional, Dict, Any, List
-from rapidfuzz import fuzz
-import phonetics
+from typing import Optional, Dict, Any, List, Sequence, Set, Tuple
+import os
+import threading
+import time
+from itertools import islice
 
-from app.utils.normalizers import normalize_name, normalize_username, normalize_email
+from app.utils.normalizers import (
+    normalize_name,
+    normalize_username,
+    normalize_email,
+    canonicalize_email,
+)
 from app.database import get_db
+from app.config import Config
+from app.utils import file_lock
+from app.utils.data_version import data_version
+from . import scoring
+from .ngram_index import NgramIndex
+from .phone_index import PhoneIndex
+from .email_index import EmailIndex
+from .snapshot import IdentitySnapshot, SnapshotManager
+from .candidate_store import CandidateStore, CandidateView, candidate_store
+from .sharded import ShardedScorer
+from .deadline import Deadline
+
+CORROBORATION_BONUS = 0.05
+MAX_FUZZY_CONFIDENCE = 0.95
+DEADLINE_CHECK_INTERVAL = 256
+
+
+class TableRows(list):
+    """Identity rows from a table read, tagged with the data version read before it"""
+
+    def __init__(self, rows: Sequence[Dict[str, Any]], data_version: int):
+        super().__init__(rows)
+        self.data_version = data_version
 
 
 class FuzzyMatcher:
@@ -15,28 +45,36 @@ class FuzzyMatcher:
     Confidence score ranges from 0.65 to 0.95.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        index: Optional[NgramIndex] = None,
+        store: Optional[CandidateStore] = None,
+    ):
         self.db = get_db()
+        self.index = index
+        if self.index is None and Config.FUZZY_INDEX_PATH and os.path.exists(Config.FUZZY_INDEX_PATH):
+            self.index = NgramIndex.load(Config.FUZZY_INDEX_PATH)
+        self._indexed_ids = set(
+            self.index.row_ids[self.index.alive].tolist()
+        ) if self.index is not None else set()
+        self.phone_index = PhoneIndex()
+        self.email_index = EmailIndex()
+        self.store = store or (candidate_store if Config.CANDIDATE_STORE else None)
+        self.snapshots = SnapshotManager(
+            Config.SNAPSHOT_DIR, Config.SNAPSHOT_CHECK_INTERVAL, Config.SNAPSHOT_REBUILD_INTERVAL
+        ) if Config.SNAPSHOT_DIR and self.store is None else None
+        self._synced_versions: Dict[str, Any] = {}
+        self._row_seconds = 0.0
+        self.sharded = ShardedScorer(Config.FUZZY_SHARDS) if Config.FUZZY_SHARDS > 0 else None
+        self._index_lock = threading.Lock()
+        self._index_dirty = False
+        self._saver_pid = None
 
     def calculate_fuzzy_score(self, str1: str, str2: str) -> float:
-        if not isinstance(str1, str) or not isinstance(str2, str):
-            return 0.0
-        if not str1 or not str2:
-            return 0.0
-
-        ratio = fuzz.ratio(str1, str2) / 100.0
-        token_sort = fuzz.token_sort_ratio(str1, str2) / 100.0
-        partial = fuzz.partial_ratio(str1, str2) / 100.0
-
-        weighted_score = (0.5 * ratio) + (0.3 * token_sort) + (0.2 * partial)
-        return weighted_score
+        return scoring.calculate_fuzzy_score(str1, str2)
 
     def phonetic_match_score(self, name1: str, name2: str) -> float:
-        if not isinstance(name1, str) or not isinstance(name2, str):
-            return 0.0
-        if not name1 or not name2:
-            return 0.0
-        return 1.0 if phonetics.metaphone(name1) == phonetics.metaphone(name2) else 0.0
+        return scoring.phonetic_match_score(name1, name2)
 
     def find_fuzzy_matches(
         self,
@@ -47,12 +85,14 @@ class FuzzyMatcher:
     ) -> List[Dict[str, Any]]:
         if not isinstance(identifier, str):
             return []
-        normalized_id = None
+
+        if platform == "whatsapp":
+            return self.find_phone_matches(identifier, display_name, threshold)
         if platform == "email":
-            normalized_id = normalize_email(identifier)
-        elif platform == "whatsapp":
-            normalized_id = identifier  # phone normalization could be improved
-        elif platform in ["dashboard", "instagram"]:
+            return self.find_email_matches(identifier, display_name, threshold)
+
+        normalized_id = None
+        if platform in ["dashboard", "instagram"]:
             normalized_id = normalize_username(identifier)
         else:
             normalized_id = identifier.lower() if identifier else None
@@ -63,69 +103,676 @@ class FuzzyMatcher:
             return []
 
         try:
-            response = (
-                self.db.table("platform_identities")
-                .select("*, unified_profiles(canonical_name)")
-                .execute()
+            if self.sharded is not None:
+                return self._find_sharded(normalized_id, norm_display_name, threshold)
+
+            candidates = self._candidate_pool(
+                self._load_candidates(), normalized_id, norm_display_name
             )
-            candidates = response.data if response.data else []
 
             results = []
 
             for identity in candidates:
-                candidate_id = identity.get("identifier")
-                candidate_name = (
-                    identity.get("display_name")
-                    or identity.get("unified_profiles", {}).get("canonical_name")
+                result = self._score_identity(
+                    identity, normalized_id, norm_display_name, threshold
                 )
-                score_id = 0.0
-                score_name = 0.0
-                phon_score = 0.0
+                if result:
+                    results.append(result)
 
-                if normalized_id and candidate_id and isinstance(candidate_id, str):
-                    score_id = self.calculate_fuzzy_score(
-                        normalized_id.lower(), candidate_id.lower()
-                    )
+            results.sort(key=lambda x: x["confidence"], reverse=True)
+            return results
 
-                if norm_display_name and candidate_name and isinstance(candidate_name, str):
-                    score_name = self.calculate_fuzzy_score(
-                        norm_display_name.lower(), candidate_name.lower()
-                    )
-                    phon_score = self.phonetic_match_score(norm_display_name, candidate_name)
+        except Exception as e:
+            print(f"Error in fuzzy match: {str(e)}")
+            return []
+
+    def find_phone_matches(
+        self,
+        phone: str,
+        display_name: Optional[str] = None,
+        threshold: float = 0.65,
+    ) -> List[Dict[str, Any]]:
+        """
+        Match a phone number through exact lookups on the phone index.
 
-                weighted_score = 0.0
-                weights = 0.0
+        Only WhatsApp identities whose number is a structural variant of
+        `phone` (same number, other country code, adjacent-digit
+        transposition, shared trailing digits) are scored.
+        """
+        norm_display_name = normalize_name(display_name) if display_name else None
 
-                if score_id > 0:
-                    weighted_score += 0.6 * score_id
-                    weights += 0.6
+        try:
+            candidates = self._load_candidates()
+            return self._results_from_id_scores(
+                self._phone_id_scores(phone, candidates),
+                self._by_id(candidates),
+                norm_display_name,
+                threshold,
+            )
 
-                if score_name > 0:
-                    weighted_score += 0.3 * score_name
-                    weights += 0.3
+        except Exception as e:
+            print(f"Error in phone fuzzy match: {str(e)}")
+            return []
 
-                if phon_score > 0:
-                    weighted_score += 0.1 * phon_score
-                    weights += 0.1
+    def find_email_matches(
+        self,
+        email: str,
+        display_name: Optional[str] = None,
+        threshold: float = 0.65,
+    ) -> List[Dict[str, Any]]:
+        """
+        Match an email address through the email index.
 
-                confidence = weighted_score / weights if weights > 0 else 0.0
+        Canonical aliases are resolved by lookup; only identities sharing
+        the canonical local part or the domain are similarity scored, and
+        oversized domain blocks are narrowed through the n-gram index.
+        """
+        norm_display_name = normalize_name(display_name) if display_name else None
 
+        try:
+            candidates = self._load_candidates()
+            return self._results_from_id_scores(
+                self._email_id_scores(email, candidates, norm_display_name),
+                self._by_id(candidates),
+                norm_display_name,
+                threshold,
+            )
+
+        except Exception as e:
+            print(f"Error in email fuzzy match: {str(e)}")
+            return []
+
+    def find_multi_matches(
+        self,
+        identifiers: Dict[str, str],
+        display_name: Optional[str] = None,
+        threshold: float = 0.65,
+        deadline: Optional[Deadline] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Score every supplied identifier, plus display_name, in one pass.
+
+        Phone numbers and email addresses are resolved through their
+        indexes; all other identifiers are scored together in a single scan
+        of the candidate pool, taking the best identifier score for each
+        identity. Evidence is then aggregated per profile: the profile takes
+        its best identity's confidence, raised by CORROBORATION_BONUS for
+        each additional supplied identifier that also matched it.
+
+        With a bounded `deadline` the pool is trimmed to what the measured
+        per-row cost allows and the scan stops when the budget runs out;
+        either marks the deadline partial.
+        """
+        deadline = deadline or Deadline()
+        norm_display_name = normalize_name(display_name) if display_name else None
+
+        try:
+            candidates = self._load_candidates()
+            by_id = self._by_id(candidates)
+
+            # Best index score per identity, and which input produced it
+            index_scores: Dict[int, Tuple[float, str]] = {}
+            scan_ids: List[Tuple[str, str]] = []
+
+            for platform, identifier in identifiers.items():
+                if not isinstance(identifier, str) or not identifier:
+                    continue
+                if platform == "whatsapp":
+                    hits = self._phone_id_scores(identifier, candidates)
+                elif platform == "email":
+                    hits = self._email_id_scores(identifier, candidates, norm_display_name)
+                else:
+                    normalized_id = self._normalize_scan_identifier(platform, identifier)
+                    if normalized_id:
+                        scan_ids.append((platform, normalized_id.lower()))
+                    continue
+                for row_id, score in hits.items():
+                    self._offer_evidence(index_scores, row_id, score, platform)
+
+            evidence: Dict[int, Tuple[float, str]] = {}
+
+            def score(identity: Dict[str, Any], best: Tuple[float, str]):
+                score_name, phon_score = self._name_scores(identity, norm_display_name)
+                confidence = scoring.combine_scores(best[0], score_name, phon_score)
                 if confidence >= threshold:
-                    results.append(
-                        {
-                            "profile_id": identity.get("profile_id"),
-                            "profile_name": identity.get("unified_profiles", {}).get(
-                                "canonical_name"
-                            ),
-                            "matched_identity": identity,
-                            "confidence": round(confidence, 2),
-                            "match_type": "fuzzy",
-                        }
-                    )
+                    evidence[identity["id"]] = (confidence, best[1])
 
-            results.sort(key=lambda x: x["confidence"], reverse=True)
-            return results
+            # Index hits first: they are few and the strongest evidence
+            for row_id, best in list(index_scores.items()):
+                if deadline.expired():
+                    deadline.mark_partial("fuzzy")
+                    break
+                identity = by_id.get(row_id)
+                if identity is not None:
+                    score(identity, best)
+
+            # Scanned rows go through the cascaded scorer, which stops as soon
+            # as a row can no longer reach the threshold
+            scan_queries = [normalized_id for _, normalized_id in scan_ids]
+            if self.sharded is not None:
+                self._scan_sharded(
+                    candidates, scan_ids, norm_display_name, threshold,
+                    index_scores, evidence, deadline,
+                )
+                return self._aggregate_profiles(evidence, by_id, threshold)
+
+            pool = self._multi_candidate_pool(candidates, scan_ids, norm_display_name)
+            pool = self._trim_to_budget(pool, deadline)
+            started = time.perf_counter()
+            scanned = 0
+
+            for identity in pool:
+                if scanned % DEADLINE_CHECK_INTERVAL == 0 and deadline.expired():
+                    deadline.mark_partial("fuzzy")
+                    break
+                scanned += 1
+
+                row_id = identity.get("id")
+                if row_id in index_scores:
+                    continue
+                candidate_id = identity.get("identifier")
+                if not isinstance(candidate_id, str) or not candidate_id:
+                    candidate_id = None
+                    if not norm_display_name:
+                        continue
+                hit = scoring.cascade_confidence(
+                    candidate_id.lower() if candidate_id else None,
+                    scoring.candidate_name(identity),
+                    scan_queries,
+                    norm_display_name,
+                    threshold,
+                )
+                if hit:
+                    confidence, best_index = hit
+                    platform = scan_ids[best_index][0] if best_index >= 0 else "display_name"
+                    evidence[row_id] = (confidence, platform)
+
+            self._record_row_cost(time.perf_counter() - started, scanned)
+            return self._aggregate_profiles(evidence, by_id, threshold)
 
         except Exception as e:
-            print(f"Error in fuzzy match: {str(e)}")
+            print(f"Error in multi-identifier fuzzy match: {str(e)}")
+            return []
+
+    def _scan_sharded(
+        self,
+        candidates: Sequence[Dict[str, Any]],
+        scan_ids: List[Tuple[str, str]],
+        norm_display_name: Optional[str],
+        threshold: float,
+        index_scores: Dict[int, Tuple[float, str]],
+        evidence: Dict[int, Tuple[float, str]],
+        deadline: Deadline,
+    ):
+        """
+        Exhaustive multi-identifier scan of the whole candidate set across
+        the shard pool, waiting at most until the deadline for the shards
+        """
+        if not scan_ids and not norm_display_name:
+            return
+        if deadline.expired():
+            deadline.mark_partial("fuzzy")
+            return
+
+        self.sharded.load(candidates, self._candidate_version(candidates))
+        hits, complete = self.sharded.scan(
+            [normalized_id for _, normalized_id in scan_ids],
+            norm_display_name,
+            threshold,
+            Config.FUZZY_TOP_K + len(index_scores),
+            timeout=deadline.remaining() if deadline.bounded else None,
+        )
+        if not complete:
+            deadline.mark_partial("fuzzy")
+        for confidence, best_index, row_id in hits:
+            if row_id in index_scores:
+                continue
+            platform = scan_ids[best_index][0] if best_index >= 0 else "display_name"
+            evidence[row_id] = (confidence, platform)
+
+    def _find_sharded(
+        self,
+        normalized_id: Optional[str],
+        norm_display_name: Optional[str],
+        threshold: float,
+    ) -> List[Dict[str, Any]]:
+        """Exhaustive scoring of the whole candidate set across the shard pool"""
+        candidates = self._load_candidates()
+        self.sharded.load(candidates, self._candidate_version(candidates))
+        hits = self.sharded.score(
+            normalized_id, norm_display_name, threshold, Config.FUZZY_TOP_K
+        )
+
+        # Shards score resident copies; report the freshly loaded rows
+        by_id = self._by_id(candidates)
+        results = []
+        for confidence, row_id in hits:
+            identity = by_id.get(row_id)
+            if identity is not None:
+                results.append(self._format_result(identity, confidence, threshold))
+
+        results.sort(key=lambda x: x["confidence"], reverse=True)
+        return results
+
+    def _phone_id_scores(
+        self, phone: str, candidates: Sequence[Dict[str, Any]]
+    ) -> Dict[int, float]:
+        """
+        Identifier scores for WhatsApp identities whose number is a
+        structural variant of `phone` (same number, other country code,
+        adjacent-digit transposition, shared trailing digits)
+        """
+        self._sync_phone_index(candidates)
+        return {row_id: score for row_id, score, _ in self.phone_index.lookup(phone)}
+
+    def _email_id_scores(
+        self,
+        email: str,
+        candidates: Sequence[Dict[str, Any]],
+        norm_display_name: Optional[str],
+    ) -> Dict[int, float]:
+        """
+        Identifier scores for canonical aliases of `email` and for the
+        identities sharing its local part or domain
+        """
+        canonical = canonicalize_email(normalize_email(email) or email)
+        if canonical is None:
+            return {}
+        query_address = "@".join(canonical)
+
+        self._sync_email_index(candidates)
+        aliases, same_local, same_domain = self.email_index.lookup(query_address)
+        if len(same_domain) >= Config.FUZZY_INDEX_MIN_ROWS:
+            pool = self._candidate_pool(candidates, query_address, norm_display_name)
+            same_domain = {c["id"] for c in pool} & same_domain
+
+        # Within a block the shared key says nothing about the person: the
+        # same-domain block is scored on the local parts only, and in the
+        # same-local-part block the domain is a weak signal
+        local, domain = canonical
+        scores = {row_id: EmailIndex.ALIAS_SCORE for row_id in aliases}
+        for row_id in same_local:
+            _, candidate_domain = self.email_index.canonical_keys(row_id)
+            scores[row_id] = EmailIndex.SAME_LOCAL_SCORE + EmailIndex.DOMAIN_BONUS * (
+                self.calculate_fuzzy_score(domain, candidate_domain)
+            )
+        for row_id in same_domain:
+            candidate_local, _ = self.email_index.canonical_keys(row_id)
+            scores[row_id] = self.calculate_fuzzy_score(local, candidate_local)
+        return scores
+
+    def _results_from_id_scores(
+        self,
+        id_scores: Dict[int, float],
+        by_id,
+        norm_display_name: Optional[str],
+        threshold: float,
+    ) -> List[Dict[str, Any]]:
+        results = []
+
+        for row_id, score_id in id_scores.items():
+            identity = by_id.get(row_id)
+            if identity is None:
+                continue
+            score_name, phon_score = self._name_scores(identity, norm_display_name)
+            result = self._build_result(
+                identity, score_id, score_name, phon_score, threshold
+            )
+            if result:
+                results.append(result)
+
+        results.sort(key=lambda x: x["confidence"], reverse=True)
+        return results
+
+    @staticmethod
+    def _normalize_scan_identifier(platform: str, identifier: str) -> Optional[str]:
+        if platform in ["dashboard", "instagram"]:
+            return normalize_username(identifier)
+        return identifier.lower() if identifier else None
+
+    @staticmethod
+    def _offer_evidence(
+        id_scores: Dict[int, Tuple[float, str]], row_id: int, score: float, platform: str
+    ):
+        if score > 0 and (row_id not in id_scores or id_scores[row_id][0] < score):
+            id_scores[row_id] = (score, platform)
+
+    def _multi_candidate_pool(
+        self,
+        candidates: Sequence[Dict[str, Any]],
+        scan_ids: List[Tuple[str, str]],
+        norm_display_name: Optional[str],
+    ) -> Sequence[Dict[str, Any]]:
+        """Union of the per-identifier n-gram pools (or every candidate for small tables)"""
+        if not scan_ids and not norm_display_name:
             return []
+        if len(candidates) < Config.FUZZY_INDEX_MIN_ROWS:
+            return candidates
+
+        pool: Dict[int, Dict[str, Any]] = {}
+        for _, normalized_id in scan_ids or [(None, None)]:
+            for identity in self._candidate_pool(candidates, normalized_id, norm_display_name):
+                pool[identity["id"]] = identity
+        return list(pool.values())
+
+    def _aggregate_profiles(
+        self,
+        evidence: Dict[int, Tuple[float, str]],
+        by_id,
+        threshold: float,
+    ) -> List[Dict[str, Any]]:
+        """Fold per-identity evidence into one result per profile"""
+        profiles: Dict[Any, List[Tuple[float, str, Dict[str, Any]]]] = {}
+        for row_id, (confidence, platform) in evidence.items():
+            identity = by_id.get(row_id)
+            key = identity.get("profile_id") or ("identity", row_id)
+            profiles.setdefault(key, []).append((confidence, platform, identity))
+
+        results = []
+        for hits in profiles.values():
+            hits.sort(key=lambda hit: hit[0], reverse=True)
+            best_confidence, _, best_identity = hits[0]
+            corroborating = len({platform for _, platform, _ in hits}) - 1
+            confidence = max(
+                best_confidence,
+                min(MAX_FUZZY_CONFIDENCE, best_confidence + CORROBORATION_BONUS * corroborating),
+            )
+            result = self._format_result(best_identity, confidence, threshold)
+            result["evidence"] = [
+                {
+                    "identity_id": identity.get("id"),
+                    "platform": identity.get("platform"),
+                    "identifier": identity.get("identifier"),
+                    "matched_on": platform,
+                    "confidence": round(hit_confidence, 2),
+                }
+                for hit_confidence, platform, identity in hits
+            ]
+            results.append(result)
+
+        results.sort(key=lambda x: x["confidence"], reverse=True)
+        return results
+
+    def _trim_to_budget(
+        self, pool: Sequence[Dict[str, Any]], deadline: Deadline
+    ) -> Sequence[Dict[str, Any]]:
+        """Keep only as many (best-ranked) rows as the remaining budget can score"""
+        if not deadline.bounded or not self._row_seconds:
+            return pool
+        max_rows = int(deadline.remaining() / self._row_seconds)
+        if len(pool) <= max_rows:
+            return pool
+        deadline.mark_partial("fuzzy")
+        return list(islice(pool, max_rows))
+
+    def _record_row_cost(self, elapsed: float, rows: int):
+        """Exponential moving average of the per-row scoring cost"""
+        if rows < DEADLINE_CHECK_INTERVAL:
+            return
+        cost = elapsed / rows
+        self._row_seconds = cost if not self._row_seconds else 0.8 * self._row_seconds + 0.2 * cost
+
+    @staticmethod
+    def _candidate_version(candidates: Sequence[Dict[str, Any]]) -> Any:
+        """
+        Key under which the shards hold `candidates`: the snapshot or
+        store version, or the data version a table read started at (every
+        write route bumps it, so merges, approvals and renames reload)
+        """
+        version = getattr(candidates, "version", None)
+        if version is not None:
+            return version
+        if isinstance(candidates, TableRows):
+            return "table", candidates.data_version
+        ids = [c["id"] for c in candidates if c.get("id") is not None]
+        return len(ids), max(ids, default=None)
+
+    def _score_identity(
+        self,
+        identity: Dict[str, Any],
+        normalized_id: Optional[str],
+        norm_display_name: Optional[str],
+        threshold: float,
+    ) -> Optional[Dict[str, Any]]:
+        confidence = scoring.score_identity(
+            identity, normalized_id, norm_display_name, threshold
+        )
+        return self._format_result(identity, confidence, threshold)
+
+    def _name_scores(
+        self, identity: Dict[str, Any], norm_display_name: Optional[str]
+    ) -> Tuple[float, float]:
+        return scoring.name_scores(identity, norm_display_name)
+
+    def _build_result(
+        self,
+        identity: Dict[str, Any],
+        score_id: float,
+        score_name: float,
+        phon_score: float,
+        threshold: float,
+    ) -> Optional[Dict[str, Any]]:
+        confidence = scoring.combine_scores(score_id, score_name, phon_score)
+        return self._format_result(identity, confidence, threshold)
+
+    def _format_result(
+        self, identity: Dict[str, Any], confidence: float, threshold: float
+    ) -> Optional[Dict[str, Any]]:
+        if confidence < threshold:
+            return None
+
+        return {
+            "profile_id": identity.get("profile_id"),
+            "profile_name": identity.get("unified_profiles", {}).get(
+                "canonical_name"
+            ),
+            "matched_identity": identity,
+            "confidence": round(confidence, 2),
+            "match_type": "fuzzy",
+        }
+
+    def _load_candidates(self) -> Sequence[Dict[str, Any]]:
+        """
+        Candidate identities: the candidate store's current view, or with
+        the store disabled the shared memory-mapped snapshot when one is
+        published in SNAPSHOT_DIR, otherwise a full table read.
+        """
+        if self.store is not None:
+            return self.store.view()
+
+        if self.snapshots is not None:
+            snapshot = self.snapshots.current()
+            if snapshot is not None:
+                return snapshot
+
+        # Read the version first: a write racing the read then moves it on
+        version, _ = data_version.current()
+        response = (
+            self.db.table("platform_identities")
+            .select("*, unified_profiles(canonical_name)")
+            .execute()
+        )
+        return TableRows(response.data or [], version)
+
+    def _candidate_pool(
+        self,
+        candidates: Sequence[Dict[str, Any]],
+        normalized_id: Optional[str],
+        norm_display_name: Optional[str],
+    ) -> Sequence[Dict[str, Any]]:
+        """
+        Narrow the candidate set to the top-K rows of the n-gram index.
+
+        Small tables are scored exhaustively; above FUZZY_INDEX_MIN_ROWS only
+        the rows retrieved by the TF-IDF index are rescored with RapidFuzz.
+        """
+        if len(candidates) < Config.FUZZY_INDEX_MIN_ROWS:
+            return candidates
+
+        self._sync_index(candidates)
+
+        query = " ".join(p for p in (normalized_id, norm_display_name) if p)
+        by_id = self._by_id(candidates)
+        hits = self.index.top_k(query, Config.FUZZY_TOP_K)
+        pool = [by_id.get(row_id) for row_id, _ in hits]
+        return [identity for identity in pool if identity is not None]
+
+    @staticmethod
+    def _by_id(candidates: Sequence[Dict[str, Any]]):
+        if isinstance(candidates, IdentitySnapshot):
+            return candidates
+        if isinstance(candidates, CandidateView):
+            return candidates.by_id
+        return {c["id"]: c for c in candidates if c.get("id") is not None}
+
+    def _needs_sync(self, name: str, candidates: Sequence[Dict[str, Any]]) -> bool:
+        """Versioned candidate sets (snapshots, store views) only need indexing once"""
+        version = getattr(candidates, "version", None)
+        if version is not None and self._synced_versions.get(name) == version:
+            return False
+        self._synced_versions[name] = version
+        return True
+
+    def _index_changes(
+        self, name: str, candidates: Sequence[Dict[str, Any]]
+    ) -> Tuple[bool, Optional[Set[int]]]:
+        """
+        What index `name` must do to catch up with `candidates`
+
+        Returns: (needs_sync, changed_ids). changed_ids lists the rows
+            added, changed or tombstoned since the last sync when
+            `candidates` is a store view whose change log reaches back that
+            far; None means the index is appended to (or rebuilt, for a
+            store view) instead.
+        """
+        previous = self._synced_versions.get(name)
+        if not self._needs_sync(name, candidates):
+            return False, None
+        if isinstance(candidates, CandidateView) and previous is not None:
+            return True, candidates.changes_since(previous)
+        return True, None
+
+    def _sync_phone_index(self, candidates: Sequence[Dict[str, Any]]):
+        """Index WhatsApp identities not yet present in the phone index"""
+        needs_sync, changed = self._index_changes("phone", candidates)
+        if not needs_sync:
+            return
+        if changed is not None:
+            for row_id in changed:
+                self.phone_index.remove(row_id)
+            candidates = self._changed_rows(candidates, changed)
+        elif isinstance(candidates, CandidateView):
+            self.phone_index = PhoneIndex()
+        self.phone_index.add_identities(
+            c for c in candidates
+            if c.get("id") is not None and c["id"] not in self.phone_index
+        )
+
+    def _sync_email_index(self, candidates: Sequence[Dict[str, Any]]):
+        """Index email identifiers not yet present in the email index"""
+        needs_sync, changed = self._index_changes("email", candidates)
+        if not needs_sync:
+            return
+        if changed is not None:
+            for row_id in changed:
+                self.email_index.remove(row_id)
+            candidates = self._changed_rows(candidates, changed)
+        elif isinstance(candidates, CandidateView):
+            self.email_index = EmailIndex()
+        self.email_index.add_identities(
+            c for c in candidates
+            if c.get("id") is not None and c["id"] not in self.email_index
+        )
+
+    def _sync_index(self, candidates: Sequence[Dict[str, Any]]):
+        """
+        Append identities not yet present in the index; with a candidate
+        store view, tombstone changed and removed rows and re-append the
+        changed ones
+        """
+        needs_sync, changed = self._index_changes("ngram", candidates)
+        if not needs_sync:
+            return
+        with self._index_lock:
+            self._update_index(candidates, changed)
+
+    def _update_index(
+        self, candidates: Sequence[Dict[str, Any]], changed: Optional[Set[int]]
+    ):
+        if self.index is None:
+            self.index = NgramIndex()
+
+        retired = 0
+        if changed is not None:
+            retired = self.index.remove(changed)
+            self._indexed_ids -= changed
+            if self.index.dead > len(self.index):
+                # Mostly tombstones: rebuild from the live rows
+                self.index = NgramIndex()
+                self._indexed_ids = set()
+            else:
+                candidates = self._changed_rows(candidates, changed)
+        elif isinstance(candidates, CandidateView):
+            # First sync (e.g. an index loaded from FUZZY_INDEX_PATH):
+            # retire rows the store no longer has
+            stale = self._indexed_ids - candidates.by_id.keys()
+            if stale:
+                retired = self.index.remove(stale)
+                self._indexed_ids -= stale
+
+        new_rows = [
+            c for c in candidates
+            if c.get("id") is not None and c["id"] not in self._indexed_ids
+        ]
+        if not new_rows and not retired:
+            return
+
+        self.index.add_identities(new_rows)
+        self._indexed_ids.update(c["id"] for c in new_rows)
+
+        if Config.FUZZY_INDEX_PATH:
+            self._index_dirty = True
+            self._start_saver()
+
+    def _start_saver(self):
+        """Start the background index saver once per process (threads do not survive a fork)"""
+        if self._saver_pid == os.getpid():
+            return
+        self._saver_pid = os.getpid()
+        threading.Thread(target=self._run_saver, daemon=True).start()
+
+    def _run_saver(self):
+        """
+        Save the index to FUZZY_INDEX_PATH every FUZZY_INDEX_SAVE_INTERVAL
+        seconds while it has unsaved changes, off the request path. Only
+        the worker holding the lock file saves; the others build the same
+        index from the same table and only take over when it exits.
+        """
+        path = Config.FUZZY_INDEX_PATH
+        lock_fd = None
+        while True:
+            time.sleep(Config.FUZZY_INDEX_SAVE_INTERVAL)
+            if not self._index_dirty:
+                continue
+            if lock_fd is None:
+                fd = file_lock.open_lock_file(f"{path}.lock")
+                if not file_lock.lock(fd, blocking=False):
+                    os.close(fd)
+                    continue
+                lock_fd = fd
+
+            with self._index_lock:
+                index, self._index_dirty = self.index.copy(), False
+            try:
+                index.save(path)
+            except OSError as e:
+                self._index_dirty = True
+                print(f"Error saving fuzzy index: {str(e)}")
+
+    @staticmethod
+    def _changed_rows(
+        candidates: CandidateView, changed: Set[int]
+    ) -> List[Dict[str, Any]]:
+        """Current rows of `changed` (tombstoned ids have none)"""
+        rows = (candidates.get(row_id) for row_id in changed)
+        return [row for row in rows if row is not None]
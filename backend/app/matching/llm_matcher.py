@@ -1,24 +1,98 @@
 """
 Phase 3: LLM Semantic Matching with Ollama Gemma 2B
 """
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable
 import json
+import threading
+import time
+import httpx
 import ollama  # Ollama Python client
 
+from app.config import Config
+
+# Structured output schema passed to Ollama's `format`
+RESPONSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'is_match': {'type': 'boolean'},
+        'confidence': {'type': 'number'},
+        'reasoning': {'type': 'string'}
+    },
+    'required': ['is_match', 'confidence', 'reasoning']
+}
+
+# Assumed call latency for deadline scheduling until a call has been timed
+UNMEASURED_CALL_SECONDS = 1.0
+
+
 class LlmMatcher:
     """
     Uses Ollama Gemma 2B to semantically match two identities.
+
+    Generation is constrained to a JSON object with a one-sentence
+    reasoning and capped at LLM_NUM_PREDICT tokens. Tokens are streamed and
+    the stream is closed as soon as the object's closing brace arrives.
+    Every call passes `keep_alive`, so the model stays resident between
+    requests; `warm_up` loads it at startup.
+
+    All calls share one client (and its keep-alive connections); a tighter
+    per-call timeout is applied to the outgoing request by an httpx
+    request hook.
     """
 
     def __init__(self):
-        self.model_name = 'gemma2:2b'
+        self.model_name = Config.OLLAMA_MODEL
+        self._call_timeout = threading.local()
+        self.client = ollama.Client(
+            host=Config.OLLAMA_HOST,
+            timeout=Config.LLM_TIMEOUT_SECONDS,
+            event_hooks={'request': [self._apply_call_timeout]}
+        )
+        # Moving average of call latency, used for deadline scheduling
+        self.avg_call_seconds = 0.0
+
+    def _apply_call_timeout(self, request: httpx.Request):
+        """Override the client timeout with the current thread's call timeout"""
+        timeout = getattr(self._call_timeout, 'seconds', None)
+        if timeout is not None:
+            request.extensions['timeout'] = httpx.Timeout(timeout).as_dict()
+
+    def _record_latency(self, seconds: float):
+        if not self.avg_call_seconds:
+            self.avg_call_seconds = seconds
+        else:
+            self.avg_call_seconds = 0.8 * self.avg_call_seconds + 0.2 * seconds
+
+    @property
+    def expected_call_seconds(self) -> float:
+        """Expected latency of the next call, for deadline scheduling"""
+        return self.avg_call_seconds or UNMEASURED_CALL_SECONDS
+
+    def warm_up(self) -> bool:
+        """Load the model into memory (an empty prompt only loads it)"""
+        try:
+            self.client.generate(model=self.model_name, prompt='', keep_alive=Config.OLLAMA_KEEP_ALIVE)
+            return True
+        except Exception as e:
+            print(f"LLM warm-up failed: {str(e)}")
+            return False
 
-    def llm_match(self, identity1: Dict[str, Any], identity2: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def llm_match(
+        self,
+        identity1: Dict[str, Any],
+        identity2: Dict[str, Any],
+        timeout: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Calls LLM with prompt and parses JSON response.
 
         `identity1` and `identity2` are dicts with keys such as:
         - platform, identifier, display_name
+
+        `timeout` caps the call in seconds: a tighter limit than
+        LLM_TIMEOUT_SECONDS becomes the request's read timeout (bounding
+        the wait for the first token), and the stream is abandoned once
+        the time is up. A call cut short returns None.
         """
 
         prompt = f"""
@@ -38,14 +112,27 @@ class LlmMatcher:
         {{
           "is_match": true or false,
           "confidence": float between 0.0 and 1.0,
-          "reasoning": "detailed explanation"
+          "reasoning": "one short sentence, at most {Config.LLM_REASONING_WORDS} words"
         }}
         """
 
+        started = time.monotonic()
+        expires_at = started + timeout if timeout is not None else None
+        if timeout is not None and timeout < Config.LLM_TIMEOUT_SECONDS:
+            self._call_timeout.seconds = max(timeout, 0.001)
         try:
-            response = ollama.generate(model=self.model_name, prompt=prompt)
-            # Parse JSON from LLM text response
-            json_str = response.get('response', '{}')
+            stream = self.client.generate(
+                model=self.model_name,
+                prompt=prompt,
+                format=RESPONSE_SCHEMA,
+                stream=True,
+                keep_alive=Config.OLLAMA_KEEP_ALIVE,
+                options={
+                    'num_predict': Config.LLM_NUM_PREDICT,
+                    'temperature': 0
+                }
+            )
+            json_str = self._read_json_object(stream, expires_at)
 
             # Defensive: extract first { ... } substring in case of extra text
             start = json_str.find('{')
@@ -67,3 +154,51 @@ class LlmMatcher:
         except Exception as e:
             print(f"LLM error or malformed response: {str(e)}")
             return None
+        finally:
+            self._call_timeout.seconds = None
+            # Failed and timed-out calls count too, so slow calls are scheduled as slow
+            self._record_latency(time.monotonic() - started)
+
+    @staticmethod
+    def _read_json_object(stream: Iterable[Any], expires_at: Optional[float] = None) -> str:
+        """
+        Accumulate streamed tokens until the first JSON object closes,
+        then close the stream so generation stops server-side
+
+        Raises: TimeoutError once `expires_at` (a monotonic time) passes
+        """
+        text = []
+        depth = 0
+        started = False
+        in_string = False
+        escaped = False
+
+        try:
+            for chunk in stream:
+                if expires_at is not None and time.monotonic() >= expires_at:
+                    raise TimeoutError('LLM call exceeded its time budget')
+                token = chunk['response'] or ''
+                text.append(token)
+                for char in token:
+                    if in_string:
+                        if escaped:
+                            escaped = False
+                        elif char == '\\':
+                            escaped = True
+                        elif char == '"':
+                            in_string = False
+                    elif char == '"':
+                        in_string = True
+                    elif char == '{':
+                        depth += 1
+                        started = True
+                    elif char == '}' and started:
+                        depth -= 1
+                        if depth == 0:
+                            return ''.join(text)
+        finally:
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+
+        return ''.join(text)
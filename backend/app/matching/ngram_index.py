@@ -0,0 +1,269 @@
+"""
+Character n-gram TF-IDF index used as the candidate generator for fuzzy matching
+"""
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+import os
+import tempfile
+import numpy as np
+from scipy import sparse
+
+
+class NgramIndex:
+    """
+    Sparse TF-IDF index over character n-grams of identity text.
+
+    Raw term frequencies are stored as a CSR matrix and re-weighted lazily,
+    so appends only touch the new rows and the IDF weights are refreshed on
+    the next query. Retrieval is a chunked sparse dot product followed by a
+    top-K selection per chunk.
+    """
+
+    def __init__(self, n: int = 3, chunk_size: int = 50000):
+        self.n = n
+        self.chunk_size = chunk_size
+        self.vocabulary: Dict[str, int] = {}
+        self.row_ids = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        self._tf = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._weighted: Optional[sparse.csr_matrix] = None
+        self._idf: Optional[np.ndarray] = None
+        self._positions: Optional[Dict[int, int]] = None
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    @property
+    def dead(self) -> int:
+        """Tombstoned rows still held in the matrix"""
+        return len(self.alive) - len(self)
+
+    @staticmethod
+    def identity_text(identity: Dict[str, Any]) -> str:
+        """Text indexed for an identity row: identifier plus its best name"""
+        name = identity.get('display_name') \
+            or (identity.get('unified_profiles') or {}).get('canonical_name')
+        parts = [p for p in (identity.get('identifier'), name) if isinstance(p, str) and p]
+        return ' '.join(parts).lower()
+
+    def ngrams(self, text: str) -> List[str]:
+        """Split text into padded character n-grams"""
+        padded = f' {text.strip().lower()} '
+        if len(padded) < self.n:
+            return [padded]
+        return [padded[i:i + self.n] for i in range(len(padded) - self.n + 1)]
+
+    def add(self, items: Iterable[Tuple[int, str]]) -> int:
+        """
+        Append (row_id, text) pairs to the index
+
+        Returns: number of rows appended
+        """
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        ids: List[int] = []
+
+        for row_id, text in items:
+            counts: Dict[int, int] = {}
+            for gram in self.ngrams(text or ''):
+                col = self.vocabulary.setdefault(gram, len(self.vocabulary))
+                counts[col] = counts.get(col, 0) + 1
+            indices.extend(counts.keys())
+            data.extend(counts.values())
+            indptr.append(len(indices))
+            ids.append(row_id)
+
+        if not ids:
+            return 0
+
+        n_cols = len(self.vocabulary)
+        new_rows = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32),
+             np.asarray(indices, dtype=np.int32),
+             np.asarray(indptr, dtype=np.int64)),
+            shape=(len(ids), n_cols)
+        )
+
+        self._tf.resize((self._tf.shape[0], n_cols))
+        self._tf = sparse.vstack([self._tf, new_rows], format='csr')
+
+        self.doc_freq = np.concatenate([
+            self.doc_freq,
+            np.zeros(n_cols - len(self.doc_freq), dtype=np.int64)
+        ])
+        np.add.at(self.doc_freq, new_rows.indices, 1)
+
+        if self._positions is not None:
+            for position, row_id in enumerate(ids, start=len(self.row_ids)):
+                self._positions[row_id] = position
+        self.row_ids = np.concatenate([self.row_ids, np.asarray(ids, dtype=np.int64)])
+        self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+        self._weighted = None
+        return len(ids)
+
+    def remove(self, row_ids: Iterable[int]) -> int:
+        """
+        Tombstone the live rows of `row_ids`
+
+        Rows stay in the matrix but are excluded from retrieval and from
+        the document frequencies; an updated identity is removed and then
+        appended again.
+
+        Returns: number of rows removed
+        """
+        if self._positions is None:
+            self._positions = {
+                int(row_id): position
+                for position, row_id in enumerate(self.row_ids.tolist())
+                if self.alive[position]
+            }
+
+        removed = 0
+        for row_id in row_ids:
+            position = self._positions.pop(row_id, None)
+            if position is None:
+                continue
+            self.alive[position] = False
+            start, stop = self._tf.indptr[position], self._tf.indptr[position + 1]
+            np.subtract.at(self.doc_freq, self._tf.indices[start:stop], 1)
+            removed += 1
+
+        if removed:
+            self._weighted = None
+        return removed
+
+    def add_identities(self, identities: Iterable[Dict[str, Any]]) -> int:
+        """Append identity rows, keyed by their `id` column"""
+        return self.add(
+            (identity['id'], self.identity_text(identity))
+            for identity in identities
+            if identity.get('id') is not None
+        )
+
+    def _refresh_weights(self):
+        """Recompute IDF weights and the L2-normalised TF-IDF matrix"""
+        n_docs = max(int(self.alive.sum()), 1)
+        self._idf = (np.log((1.0 + n_docs) / (1.0 + self.doc_freq)) + 1.0).astype(np.float32)
+
+        weighted = self._tf.multiply(self._idf).tocsr()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self._weighted = sparse.diags(1.0 / norms).dot(weighted).tocsr().astype(np.float32)
+
+    def _query_vector(self, text: str) -> Optional[sparse.csr_matrix]:
+        counts: Dict[int, int] = {}
+        for gram in self.ngrams(text):
+            col = self.vocabulary.get(gram)
+            if col is not None:
+                counts[col] = counts.get(col, 0) + 1
+
+        if not counts:
+            return None
+
+        cols = np.fromiter(counts.keys(), dtype=np.int32)
+        values = np.fromiter(counts.values(), dtype=np.float32) * self._idf[cols]
+        values /= np.linalg.norm(values)
+        return sparse.csr_matrix(
+            (values, (np.zeros(len(cols), dtype=np.int32), cols)),
+            shape=(1, len(self.vocabulary))
+        )
+
+    def top_k(self, text: str, k: int = 200, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        Retrieve the k rows with the highest cosine similarity to `text`
+
+        Returns: list of (row_id, similarity) sorted by similarity desc
+        """
+        if not text or self._tf.shape[0] == 0 or k <= 0:
+            return []
+
+        if self._weighted is None:
+            self._refresh_weights()
+
+        query = self._query_vector(text)
+        if query is None:
+            return []
+
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float32)
+        query_t = query.T.tocsc()
+
+        for start in range(0, self._weighted.shape[0], self.chunk_size):
+            stop = min(start + self.chunk_size, self._weighted.shape[0])
+            scores = self._weighted[start:stop].dot(query_t).toarray().ravel()
+            scores[~self.alive[start:stop]] = 0.0
+
+            keep = np.flatnonzero(scores > min_score)
+            if len(keep) > k:
+                keep = keep[np.argpartition(scores[keep], -k)[-k:]]
+
+            best_rows = np.concatenate([best_rows, keep + start])
+            best_scores = np.concatenate([best_scores, scores[keep]])
+            if len(best_rows) > k:
+                top = np.argpartition(best_scores, -k)[-k:]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+
+        order = np.argsort(-best_scores, kind='stable')
+        return [
+            (int(self.row_ids[i]), float(best_scores[j]))
+            for j, i in zip(order, best_rows[order])
+        ]
+
+    def copy(self) -> 'NgramIndex':
+        """Copy of the index state that later appends and removals leave untouched"""
+        index = NgramIndex(n=self.n, chunk_size=self.chunk_size)
+        index.vocabulary = dict(self.vocabulary)
+        index.row_ids = self.row_ids
+        index.alive = self.alive.copy()
+        index.doc_freq = self.doc_freq.copy()
+        index._tf = self._tf.copy()
+        return index
+
+    def save(self, path: str):
+        """
+        Serialize the index to a compressed .npz file, replacing it atomically
+
+        The file is written under a unique temporary name in the same
+        directory, so concurrent savers never write into each other's file.
+        """
+        vocab = np.empty(len(self.vocabulary), dtype=object)
+        for gram, col in self.vocabulary.items():
+            vocab[col] = gram
+
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)), prefix='.fuzzy-index-'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                np.savez_compressed(
+                    fh,
+                    n=np.asarray(self.n),
+                    vocabulary=vocab.astype(str),
+                    row_ids=self.row_ids,
+                    alive=self.alive,
+                    doc_freq=self.doc_freq,
+                    tf_data=self._tf.data,
+                    tf_indices=self._tf.indices,
+                    tf_indptr=self._tf.indptr,
+                    tf_shape=np.asarray(self._tf.shape)
+                )
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, chunk_size: int = 50000) -> 'NgramIndex':
+        """Load an index written by `save`"""
+        with np.load(path, allow_pickle=False) as payload:
+            index = cls(n=int(payload['n']), chunk_size=chunk_size)
+            index.vocabulary = {str(gram): col for col, gram in enumerate(payload['vocabulary'])}
+            index.row_ids = payload['row_ids']
+            index.alive = payload['alive']
+            index.doc_freq = payload['doc_freq']
+            index._tf = sparse.csr_matrix(
+                (payload['tf_data'], payload['tf_indices'], payload['tf_indptr']),
+                shape=tuple(payload['tf_shape'])
+            )
+        return index
@@ -0,0 +1,151 @@
+"""
+Phone-number index for WhatsApp fuzzy matching
+"""
+from collections import defaultdict
+from typing import Dict, Any, List, Iterable, Optional, Set, Tuple
+import re
+import phonenumbers
+
+from app.utils.normalizers import normalize_phone
+
+
+class PhoneIndex:
+    """
+    Exact-lookup index over phone numbers.
+
+    Numbers are keyed by their national significant number (NSN) and by
+    their last 7-10 digits, so country-code variants, adjacent-digit
+    transpositions and numbers stored without a prefix are all found with
+    dictionary lookups instead of string similarity over the whole table.
+    """
+
+    SUFFIX_LENGTHS = (10, 9, 8, 7)
+
+    EXACT_SCORE = 0.95
+    COUNTRY_CODE_SCORE = 0.9
+    TRANSPOSITION_SCORE = 0.85
+    # Shared trailing digits: 7-8 digits score below the fuzzy threshold
+    # (0.55, 0.6) and only match with a corroborating name; 9-10 digits
+    # (0.65, 0.7) can match on their own
+    SUFFIX_BASE_SCORE = 0.55
+    SUFFIX_STEP_SCORE = 0.05
+
+    def __init__(self):
+        self.keys: Dict[int, Tuple[Optional[str], str]] = {}
+        self.by_nsn: Dict[str, Set[int]] = defaultdict(set)
+        self.by_suffix: Dict[Tuple[int, str], Set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, row_id: int) -> bool:
+        return row_id in self.keys
+
+    @staticmethod
+    def phone_keys(phone: Optional[str]) -> Optional[Tuple[Optional[str], str]]:
+        """
+        Split a phone number into lookup keys
+
+        Returns: (E.164 number or None if not valid, national significant number)
+        """
+        if not isinstance(phone, str) or not phone:
+            return None
+
+        e164 = normalize_phone(phone)
+        try:
+            parsed = phonenumbers.parse(e164 or re.sub(r'[^\d+]', '', phone), "IN")
+            nsn = phonenumbers.national_significant_number(parsed)
+        except phonenumbers.NumberParseException:
+            nsn = re.sub(r'\D', '', phone).lstrip('0')
+
+        if len(nsn) < min(PhoneIndex.SUFFIX_LENGTHS):
+            return None
+        return e164, nsn
+
+    def add(self, row_id: int, phone: Optional[str]) -> bool:
+        """Index a phone number under `row_id`"""
+        keys = self.phone_keys(phone)
+        if keys is None:
+            return False
+
+        self.keys[row_id] = keys
+        e164, nsn = keys
+        self.by_nsn[nsn].add(row_id)
+        for length in self.SUFFIX_LENGTHS:
+            if len(nsn) >= length:
+                self.by_suffix[(length, nsn[-length:])].add(row_id)
+        return True
+
+    def remove(self, row_id: int) -> bool:
+        """Drop the number indexed under `row_id`"""
+        keys = self.keys.pop(row_id, None)
+        if keys is None:
+            return False
+
+        _, nsn = keys
+        self._discard(self.by_nsn, nsn, row_id)
+        for length in self.SUFFIX_LENGTHS:
+            if len(nsn) >= length:
+                self._discard(self.by_suffix, (length, nsn[-length:]), row_id)
+        return True
+
+    @staticmethod
+    def _discard(buckets: Dict[Any, Set[int]], key: Any, row_id: int):
+        bucket = buckets.get(key)
+        if bucket is not None:
+            bucket.discard(row_id)
+            if not bucket:
+                del buckets[key]
+
+    def add_identities(self, identities: Iterable[Dict[str, Any]]) -> int:
+        """Index the identifiers of WhatsApp identity rows"""
+        added = 0
+        for identity in identities:
+            if identity.get('platform') == 'whatsapp' and identity.get('id') is not None:
+                added += self.add(identity['id'], identity.get('identifier'))
+        return added
+
+    def lookup(self, phone: str) -> List[Tuple[int, float, str]]:
+        """
+        Find indexed numbers that are structural variants of `phone`
+
+        Returns: list of (row_id, score, reason) sorted by score desc
+        """
+        keys = self.phone_keys(phone)
+        if keys is None:
+            return []
+
+        e164, nsn = keys
+        best: Dict[int, Tuple[float, str]] = {}
+
+        def offer(row_ids: Iterable[int], score: float, reason: str):
+            for row_id in row_ids:
+                if row_id not in best or best[row_id][0] < score:
+                    best[row_id] = (score, reason)
+
+        for row_id in self.by_nsn.get(nsn, ()):
+            same_number = e164 is not None and self.keys[row_id][0] == e164
+            offer(
+                [row_id],
+                self.EXACT_SCORE if same_number else self.COUNTRY_CODE_SCORE,
+                'exact' if same_number else 'country_code'
+            )
+
+        for i in range(len(nsn) - 1):
+            if nsn[i] == nsn[i + 1]:
+                continue
+            swapped = nsn[:i] + nsn[i + 1] + nsn[i] + nsn[i + 2:]
+            offer(self.by_nsn.get(swapped, ()), self.TRANSPOSITION_SCORE, 'transposition')
+
+        for length in self.SUFFIX_LENGTHS:
+            if len(nsn) < length:
+                continue
+            score = self.SUFFIX_BASE_SCORE \
+                + self.SUFFIX_STEP_SCORE * (length - min(self.SUFFIX_LENGTHS))
+            offer(self.by_suffix.get((length, nsn[-length:]), ()), score, f'last_{length}_digits')
+
+        return sorted(
+            ((row_id, score, reason) for row_id, (score, reason) in best.items()),
+            key=lambda hit: hit[1],
+            reverse=True
+        )
@@ -0,0 +1,292 @@
+"""
+Profile merge engine: folds duplicate unified profiles into one survivor
+
+Merged profiles keep their row with status 'merged' and a `merged_into`
+forwarding pointer (nullable integer column on unified_profiles).
+With CANDIDATE_STORE on, re-pointed identities and retired profiles get
+a fresh `updated_at`, which its delta syncs key on (columns from
+migrations/001_sync_columns.sql).
+Pointers are always flattened to the final survivor, so following one is
+a single hop.
+
+The writes are ordered so that an interrupted merge can be re-run:
+identities and candidates move first and the losers are retired last, so
+a re-run with the same groups finds the losers still active and finishes
+the job. Any merge involving a survivor also moves identities and
+candidates still attached to profiles already merged into it.
+
+Usage (batch mode): python -m app.matching.profile_merger groups.json
+where groups.json holds a list of groups, each a list of profile ids or
+{"profile_ids": [...], "survivor": id}.
+"""
+from typing import Optional, Dict, Any, List, Iterable
+import argparse
+import json
+from datetime import datetime, timezone
+
+from app.config import Config
+from app.database import IN_CHUNK_SIZE, PAGE_SIZE, get_db
+from app.utils.data_version import data_version
+from app.utils.profile_cache import profile_cache
+
+SURVIVOR_STRATEGIES = ['most_identities', 'oldest']
+
+
+class ProfileMerger:
+    """
+    Set-based merging of profile groups.
+
+    Whatever the number of groups, a merge reads profiles, identities and
+    match candidates once each and writes them back with one batched
+    upsert per table (chunked only for very large id lists).
+    """
+
+    def __init__(self):
+        self.db = get_db()
+
+    def merge(
+        self,
+        groups: List[Any],
+        strategy: str = 'most_identities'
+    ) -> List[Dict[str, Any]]:
+        """
+        Merge each group of profile ids into a single survivor
+
+        Args:
+            groups: lists of profile ids, or dicts with `profile_ids` and an
+                optional explicit `survivor`
+            strategy: survivor choice when none is given
+                ('most_identities' or 'oldest')
+
+        Returns:
+            One result per (combined) group
+        """
+        if strategy not in SURVIVOR_STRATEGIES:
+            raise ValueError(f"strategy must be one of: {', '.join(SURVIVOR_STRATEGIES)}")
+
+        requested = self._combine_groups(groups)
+        all_ids = sorted({pid for group in requested for pid in group['profile_ids']})
+        if not all_ids:
+            return []
+
+        # 1. Profiles in the groups plus anything already forwarded to them
+        profiles = self._select_in(
+            'unified_profiles', '*, platform_identities(count)', 'id', all_ids,
+            or_column='merged_into'
+        )
+        by_id = {p['id']: p for p in profiles}
+
+        results = []
+        survivor_of: Dict[int, int] = {}
+
+        for group in requested:
+            active = [
+                pid for pid in group['profile_ids']
+                if pid in by_id and by_id[pid].get('status') != 'merged'
+            ]
+            skipped = [pid for pid in group['profile_ids'] if pid not in active]
+            result = {
+                'profile_ids': group['profile_ids'],
+                'survivor': None,
+                'merged': [],
+                'skipped': skipped
+            }
+            results.append(result)
+
+            survivor = group.get('survivor')
+            if survivor is not None and survivor not in active:
+                result['error'] = f'Survivor {survivor} is not an active profile in the group'
+                continue
+            if len(active) < 2:
+                result['error'] = 'At least two active profiles are required'
+                continue
+
+            survivor = survivor if survivor is not None else self._choose_survivor(
+                [by_id[pid] for pid in active], strategy
+            )
+            result['survivor'] = survivor
+            result['merged'] = [pid for pid in active if pid != survivor]
+            for pid in result['merged']:
+                survivor_of[pid] = survivor
+
+        if not survivor_of:
+            return results
+
+        # Losers, plus profiles merged earlier whose identities or candidates
+        # a failed merge left behind, mapped to their final survivor
+        forward: Dict[int, int] = {}
+        for profile in profiles:
+            if profile['id'] in survivor_of:
+                forward[profile['id']] = survivor_of[profile['id']]
+            elif profile.get('status') == 'merged' and profile.get('merged_into'):
+                target = profile['merged_into']
+                forward[profile['id']] = survivor_of.get(target, target)
+        retiring = sorted(forward)
+        stamp = {'updated_at': datetime.now(timezone.utc).isoformat()} if Config.CANDIDATE_STORE else {}
+
+        try:
+            identities, candidates = self._apply(profiles, forward, retiring, stamp)
+        finally:
+            # Also after a failure: earlier steps may have written
+            profile_cache.invalidate(set(forward) | set(forward.values()))
+
+        moved_identities = self._count_by(identities, 'profile_id')
+        moved_candidates = self._count_by(candidates, 'target_profile_id')
+        for result in results:
+            result['identities_moved'] = sum(moved_identities.get(pid, 0) for pid in result['merged'])
+            result['candidates_moved'] = sum(moved_candidates.get(pid, 0) for pid in result['merged'])
+
+        return results
+
+    def _apply(
+        self,
+        profiles: List[Dict[str, Any]],
+        forward: Dict[int, int],
+        retiring: List[int],
+        stamp: Dict[str, Any]
+    ):
+        """
+        Write a merge: re-point identities and candidates, then retire
+
+        Returns: (identities, candidates) as they were before re-pointing
+        """
+        # 2. Re-point identities
+        identities = self._select_in('platform_identities', '*', 'profile_id', retiring)
+        if identities:
+            self._upsert('platform_identities', [
+                {**identity, 'profile_id': forward[identity['profile_id']], **stamp}
+                for identity in identities
+            ])
+
+        # 3. Re-point match candidates
+        candidates = self._select_in('match_candidates', '*', 'target_profile_id', retiring)
+        if candidates:
+            self._upsert('match_candidates', [
+                {**candidate, 'target_profile_id': forward[candidate['target_profile_id']]}
+                for candidate in candidates
+            ])
+
+        # 4. Retire losers and flatten older forwarding pointers onto the survivor
+        retired = []
+        for profile in profiles:
+            target = forward.get(profile['id'])
+            if target is None:
+                continue
+            if profile.get('status') == 'merged' and profile.get('merged_into') == target:
+                continue
+            row = {k: v for k, v in profile.items() if k != 'platform_identities'}
+            row.update({'status': 'merged', 'merged_into': target, **stamp})
+            retired.append(row)
+        self._upsert('unified_profiles', retired)
+
+        return identities, candidates
+
+    @staticmethod
+    def _combine_groups(groups: List[Any]) -> List[Dict[str, Any]]:
+        """Normalize group specs and union groups that share a profile"""
+        parent: Dict[int, int] = {}
+
+        def find(pid: int) -> int:
+            while parent.setdefault(pid, pid) != pid:
+                parent[pid] = parent[parent[pid]]
+                pid = parent[pid]
+            return pid
+
+        survivors: Dict[int, int] = {}
+        for group in groups:
+            if isinstance(group, dict):
+                ids, survivor = group.get('profile_ids') or [], group.get('survivor')
+            else:
+                ids, survivor = group, None
+            if not isinstance(ids, list) or not all(isinstance(pid, int) for pid in ids):
+                raise ValueError('Each group must be a list of integer profile ids')
+            if survivor is not None:
+                if survivor not in ids:
+                    raise ValueError(f'Survivor {survivor} is not in its group')
+                survivors[survivor] = survivor
+            for pid in ids:
+                parent[find(pid)] = find(ids[0])
+
+        combined: Dict[int, Dict[str, Any]] = {}
+        for pid in parent:
+            group = combined.setdefault(find(pid), {'profile_ids': [], 'survivor': None})
+            group['profile_ids'].append(pid)
+            if pid in survivors:
+                if group['survivor'] is not None and group['survivor'] != pid:
+                    raise ValueError('Overlapping groups name different survivors')
+                group['survivor'] = pid
+
+        for group in combined.values():
+            group['profile_ids'].sort()
+        return list(combined.values())
+
+    @staticmethod
+    def _choose_survivor(profiles: List[Dict[str, Any]], strategy: str) -> int:
+        def identity_count(profile: Dict[str, Any]) -> int:
+            counts = profile.get('platform_identities') or [{}]
+            return counts[0].get('count', 0)
+
+        if strategy == 'oldest':
+            return min(profiles, key=lambda p: (p.get('created_at') or '', p['id']))['id']
+        return min(profiles, key=lambda p: (-identity_count(p), p['id']))['id']
+
+    @staticmethod
+    def _count_by(rows: Iterable[Dict[str, Any]], column: str) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for row in rows:
+            counts[row[column]] = counts.get(row[column], 0) + 1
+        return counts
+
+    def _select_in(
+        self,
+        table: str,
+        columns: str,
+        column: str,
+        values: List[int],
+        or_column: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rows whose `column` (or `or_column`) is in `values`; ids are sent in
+        chunks and each chunk is paged, as responses are capped in rows
+        """
+        rows: List[Dict[str, Any]] = []
+        for start in range(0, len(values), IN_CHUNK_SIZE):
+            chunk = values[start:start + IN_CHUNK_SIZE]
+            offset = 0
+            while True:
+                query = self.db.table(table).select(columns)
+                if or_column:
+                    id_list = ','.join(str(v) for v in chunk)
+                    query = query.or_(f'{column}.in.({id_list}),{or_column}.in.({id_list})')
+                else:
+                    query = query.in_(column, chunk)
+                page = query.order('id').range(offset, offset + PAGE_SIZE - 1).execute().data or []
+                rows.extend(page)
+                if len(page) < PAGE_SIZE:
+                    break
+                offset += PAGE_SIZE
+
+        # Chunks may overlap through the or-filter
+        return list({row['id']: row for row in rows}.values())
+
+    def _upsert(self, table: str, rows: List[Dict[str, Any]]):
+        if rows:
+            self.db.table(table).upsert(rows).execute()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Batch profile merge')
+    parser.add_argument('groups_file', help='JSON file with a list of profile id groups')
+    parser.add_argument('--strategy', choices=SURVIVOR_STRATEGIES, default='most_identities')
+    args = parser.parse_args()
+
+    with open(args.groups_file) as fh:
+        merge_groups = json.load(fh)
+
+    merge_results = ProfileMerger().merge(merge_groups, args.strategy)
+    # Outside the API, so bump the shared version for caches and validators here
+    if any(merge_result['merged'] for merge_result in merge_results):
+        data_version.bump()
+
+    for merge_result in merge_results:
+        print(json.dumps(merge_result))
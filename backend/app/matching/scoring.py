@@ -0,0 +1,353 @@
+"""
+Pure fuzzy scoring functions shared by FuzzyMatcher and its shard workers
+"""
+from typing import Optional, Dict, Any, List, Sequence, Tuple
+from rapidfuzz import fuzz
+import phonetics
+
+ID_WEIGHT = 0.6
+NAME_WEIGHT = 0.3
+PHONETIC_WEIGHT = 0.1
+
+# Cascade stages, cheapest first
+CASCADE_STAGES = ("length", "ratio", "token_sort", "partial", "metaphone")
+
+# Slack on bound checks and RapidFuzz cutoffs (percent) so floating-point
+# rounding can never prune a candidate that reaches the threshold
+BOUND_EPSILON = 1e-9
+CUTOFF_EPSILON = 1e-6
+
+
+def calculate_fuzzy_score(str1: str, str2: str) -> float:
+    if not isinstance(str1, str) or not isinstance(str2, str):
+        return 0.0
+    if not str1 or not str2:
+        return 0.0
+
+    ratio = fuzz.ratio(str1, str2) / 100.0
+    token_sort = fuzz.token_sort_ratio(str1, str2) / 100.0
+    partial = fuzz.partial_ratio(str1, str2) / 100.0
+
+    weighted_score = (0.5 * ratio) + (0.3 * token_sort) + (0.2 * partial)
+    return weighted_score
+
+
+def phonetic_match_score(name1: str, name2: str) -> float:
+    if not isinstance(name1, str) or not isinstance(name2, str):
+        return 0.0
+    if not name1 or not name2:
+        return 0.0
+    return 1.0 if phonetics.metaphone(name1) == phonetics.metaphone(name2) else 0.0
+
+
+def candidate_name(identity: Dict[str, Any]) -> Optional[str]:
+    return (
+        identity.get("display_name")
+        or (identity.get("unified_profiles") or {}).get("canonical_name")
+    )
+
+
+def name_scores(
+    identity: Dict[str, Any], norm_display_name: Optional[str]
+) -> Tuple[float, float]:
+    """Fuzzy and phonetic scores of the query name against an identity"""
+    name = candidate_name(identity)
+    if not norm_display_name or not name or not isinstance(name, str):
+        return 0.0, 0.0
+
+    score_name = calculate_fuzzy_score(norm_display_name.lower(), name.lower())
+    phon_score = phonetic_match_score(norm_display_name, name)
+    return score_name, phon_score
+
+
+def combine_scores(score_id: float, score_name: float, phon_score: float) -> float:
+    """Weighted confidence over the signals that fired (id 0.6, name 0.3, phonetic 0.1)"""
+    weighted_score = 0.0
+    weights = 0.0
+
+    if score_id > 0:
+        weighted_score += ID_WEIGHT * score_id
+        weights += ID_WEIGHT
+
+    if score_name > 0:
+        weighted_score += NAME_WEIGHT * score_name
+        weights += NAME_WEIGHT
+
+    if phon_score > 0:
+        weighted_score += PHONETIC_WEIGHT * phon_score
+        weights += PHONETIC_WEIGHT
+
+    return weighted_score / weights if weights > 0 else 0.0
+
+
+def max_combined_score(
+    id_bound: float,
+    id_positive: bool,
+    name_bound: float,
+    name_positive: bool,
+    phonetic_bound: float,
+) -> float:
+    """
+    Upper bound of `combine_scores` given an upper bound per signal and
+    whether the id and name scores are already known to be positive.
+
+    A signal scoring 0 drops out of the weighted average, so the best case
+    keeps the signals known to be positive and adds the others, highest
+    first, while they raise the average.
+    """
+    total = weights = 0.0
+    optional = []
+    if id_positive:
+        total, weights = ID_WEIGHT * id_bound, ID_WEIGHT
+    elif id_bound > 0:
+        optional.append((id_bound, ID_WEIGHT))
+    if name_positive:
+        total += NAME_WEIGHT * name_bound
+        weights += NAME_WEIGHT
+    elif name_bound > 0:
+        optional.append((name_bound, NAME_WEIGHT))
+    if phonetic_bound > 0:
+        optional.append((phonetic_bound, PHONETIC_WEIGHT))
+
+    for bound, weight in sorted(optional, reverse=True):
+        if weights and bound * weights <= total:
+            break
+        total += weight * bound
+        weights += weight
+    return total / weights if weights else 0.0
+
+
+def _required_score(weight: float, others, threshold: float) -> float:
+    """
+    Smallest value of a signal for which the combined score can still reach
+    `threshold`, given (weight, bound, positive) for the other signals
+
+    Minimizes (threshold * (weight + W) - A) / weight over the signals that
+    may be included: only positive ones and those bounded above the
+    threshold lower it.
+    """
+    numerator = threshold * weight
+    for other_weight, bound, positive in others:
+        if positive or bound > threshold:
+            numerator += other_weight * (threshold - bound)
+    return max(0.0, numerator / weight - BOUND_EPSILON)
+
+
+class _PairCascade:
+    """
+    `calculate_fuzzy_score` of one string pair, evaluated a scorer at a time.
+
+    Until a scorer has run its value is bounded: `ratio` by the length
+    ratio 2 * min(len) / (len1 + len2), the others by 1. Scorers run with a
+    `score_cutoff` derived from the score the pair must reach for the
+    candidate to reach the threshold; a pair falling below it is dead.
+    Scores at or above a cutoff are exact.
+    """
+
+    __slots__ = ("a", "b", "scores", "upper", "positive", "dead")
+
+    def __init__(self, a: str, b: str):
+        self.a = a
+        self.b = b
+        self.scores = [2.0 * min(len(a), len(b)) / (len(a) + len(b)), 1.0, 1.0]
+        self.upper = (0.5 * self.scores[0]) + 0.5
+        self.positive = False
+        self.dead = False
+
+    def run(self, stage: int, need: float):
+        """Run scorer `stage`; the pair dies if its score cannot stay >= `need`"""
+        weight, scorer = _PAIR_SCORERS[stage]
+        rest = self.upper - weight * self.scores[stage]
+        cutoff = (need - rest) / weight * 100.0 - CUTOFF_EPSILON
+        if cutoff > 0:
+            score = scorer(self.a, self.b, score_cutoff=cutoff)
+            if score < cutoff:
+                self.dead = True
+                return
+        else:
+            score = scorer(self.a, self.b)
+        score /= 100.0
+        self.scores[stage] = score
+        self.upper = rest + weight * score
+        self.positive = self.positive or score > 0
+
+    def score(self) -> float:
+        """Exact score, identical to `calculate_fuzzy_score` once every scorer ran"""
+        ratio, token_sort, partial = self.scores
+        return (0.5 * ratio) + (0.3 * token_sort) + (0.2 * partial)
+
+
+# (weight in calculate_fuzzy_score, scorer) per cascade stage
+_PAIR_SCORERS = (
+    (0.5, fuzz.ratio),
+    (0.3, fuzz.token_sort_ratio),
+    (0.2, fuzz.partial_ratio),
+)
+
+
+def _count(stats: Optional[Dict[str, int]], key: str):
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + 1
+
+
+def cascade_confidence(
+    candidate_id: Optional[str],
+    name: Optional[str],
+    query_ids: Sequence[str],
+    query_name: Optional[str],
+    threshold: float,
+    stats: Optional[Dict[str, int]] = None,
+) -> Optional[Tuple[float, int]]:
+    """
+    Cascaded early-exit scoring of one candidate against the query.
+
+    Runs the cheapest signal first (length bounds, then `ratio`,
+    `token_sort_ratio`, `partial_ratio` and finally metaphone) and stops
+    as soon as the best achievable combined score falls below `threshold`.
+    Candidates that reach the threshold get exactly the confidence the
+    exhaustive scorer gives them.
+
+    Args:
+        candidate_id: lower-cased candidate identifier (None if missing)
+        name: candidate display or canonical name
+        query_ids: lower-cased query identifiers; the best one counts
+        query_name: normalized query name
+        stats: optional counters, incremented under the stage that pruned
+            the candidate, or under "scored"
+
+    Returns: (confidence, index of the best query id or -1), or None when
+        the candidate cannot reach `threshold`
+    """
+    floor = threshold - BOUND_EPSILON
+    pairs: List[_PairCascade] = []
+    if candidate_id:
+        pairs = [_PairCascade(query_id, candidate_id) for query_id in query_ids if query_id]
+    name_pair = None
+    if query_name and name and isinstance(name, str):
+        name_pair = _PairCascade(query_name.lower(), name.lower())
+    phonetic_bound = 1.0 if name_pair is not None else 0.0
+
+    if name_pair is None and len(pairs) == 1:
+        # Identifier only: the confidence is the pair's score
+        pair = pairs[0]
+        for stage in range(len(_PAIR_SCORERS) + 1):
+            if pair.dead or pair.upper < floor:
+                _count(stats, CASCADE_STAGES[stage])
+                return None
+            if stage < len(_PAIR_SCORERS):
+                pair.run(stage, threshold - BOUND_EPSILON)
+        _count(stats, "scored")
+        confidence = combine_scores(pair.score(), 0.0, 0.0)
+        if confidence < threshold:
+            return None
+        return confidence, next(index for index, query_id in enumerate(query_ids) if query_id)
+
+    # A pair dies only when its score is below what reaching the threshold
+    # needs, so a candidate that reaches it takes its id score from a live pair
+    for stage in range(len(_PAIR_SCORERS) + 1):
+        id_bound, id_positive, live = 0.0, False, False
+        for pair in pairs:
+            if not pair.dead:
+                live = True
+                id_bound = max(id_bound, pair.upper)
+                id_positive = id_positive or pair.positive
+        name_bound, name_positive = 0.0, False
+        if name_pair is not None:
+            name_bound, name_positive = name_pair.upper, name_pair.positive
+
+        if (pairs and not live) or (name_pair is not None and name_pair.dead) or max_combined_score(
+            id_bound, id_positive, name_bound, name_positive, phonetic_bound
+        ) < floor:
+            _count(stats, CASCADE_STAGES[stage])
+            return None
+        if stage == len(_PAIR_SCORERS):
+            break
+
+        if live:
+            if id_positive or max_combined_score(
+                0.0, False, name_bound, name_positive, phonetic_bound
+            ) < floor:
+                need = _required_score(ID_WEIGHT, (
+                    (NAME_WEIGHT, name_bound, name_positive),
+                    (PHONETIC_WEIGHT, phonetic_bound, False),
+                ), threshold)
+            else:
+                need = 0.0
+            for pair in pairs:
+                if not pair.dead:
+                    pair.run(stage, need)
+                    if not pair.dead:
+                        id_bound = max(id_bound, pair.upper)
+                        id_positive = id_positive or pair.positive
+
+        if name_pair is not None:
+            if name_positive or max_combined_score(
+                id_bound, id_positive, 0.0, False, phonetic_bound
+            ) < floor:
+                need = _required_score(NAME_WEIGHT, (
+                    (ID_WEIGHT, id_bound, id_positive),
+                    (PHONETIC_WEIGHT, phonetic_bound, False),
+                ), threshold)
+            else:
+                need = 0.0
+            name_pair.run(stage, need)
+
+    score_id, best_index = 0.0, -1
+    query_indexes = [index for index, query_id in enumerate(query_ids) if query_id]
+    for index, pair in zip(query_indexes, pairs):
+        if not pair.dead:
+            pair_score = pair.score()
+            if pair_score > score_id:
+                score_id, best_index = pair_score, index
+    score_name = name_pair.score() if name_pair is not None else 0.0
+
+    phon_score = 0.0
+    if name_pair is not None:
+        # Metaphone last: its best case is a phonetic hit
+        if combine_scores(score_id, score_name, 1.0) < floor:
+            _count(stats, "metaphone")
+            return None
+        phon_score = phonetic_match_score(query_name, name)
+
+    _count(stats, "scored")
+    confidence = combine_scores(score_id, score_name, phon_score)
+    if confidence < threshold:
+        return None
+    return confidence, best_index
+
+
+def score_identity(
+    identity: Dict[str, Any],
+    normalized_id: Optional[str],
+    norm_display_name: Optional[str],
+    threshold: Optional[float] = None,
+    stats: Optional[Dict[str, int]] = None,
+) -> float:
+    """
+    Confidence that `identity` matches the normalized query
+
+    With a `threshold` the cascaded scorer is used: confidences at or
+    above it are exact, anything below comes back as 0.0.
+    """
+    candidate_id = identity.get("identifier")
+
+    if threshold is not None:
+        if not isinstance(candidate_id, str) or not candidate_id or not normalized_id:
+            candidate_id = None
+        hit = cascade_confidence(
+            candidate_id.lower() if candidate_id else None,
+            candidate_name(identity),
+            [normalized_id.lower()] if normalized_id else [],
+            norm_display_name,
+            threshold,
+            stats,
+        )
+        return hit[0] if hit else 0.0
+
+    score_id = 0.0
+
+    if normalized_id and candidate_id and isinstance(candidate_id, str):
+        score_id = calculate_fuzzy_score(normalized_id.lower(), candidate_id.lower())
+
+    score_name, phon_score = name_scores(identity, norm_display_name)
+    return combine_scores(score_id, score_name, phon_score)
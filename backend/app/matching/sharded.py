@@ -0,0 +1,166 @@
+"""
+Process-pool sharded fuzzy scoring
+"""
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import heapq
+import multiprocessing
+
+from .scoring import candidate_name, cascade_confidence, score_identity
+from .snapshot import IdentitySnapshot
+
+# Shard held resident by each pool process
+_shard: List[Dict[str, Any]] = []
+
+SHARD_FIELDS = ('id', 'profile_id', 'platform', 'identifier', 'display_name', 'unified_profiles')
+
+
+def _load_rows(rows: List[Dict[str, Any]]) -> int:
+    global _shard
+    _shard = rows
+    return len(_shard)
+
+
+def _load_snapshot_stride(path: str, shard: int, shards: int) -> int:
+    global _shard
+    snapshot = IdentitySnapshot(path)
+    _shard = [snapshot.row(position) for position in range(shard, len(snapshot), shards)]
+    return len(_shard)
+
+
+def _score_shard(
+    normalized_id: Optional[str],
+    norm_display_name: Optional[str],
+    threshold: float,
+    top_k: int,
+) -> List[Tuple[float, int]]:
+    hits = []
+    for identity in _shard:
+        confidence = score_identity(identity, normalized_id, norm_display_name, threshold)
+        if confidence >= threshold:
+            hits.append((confidence, identity['id']))
+    return heapq.nlargest(top_k, hits)
+
+
+def _scan_shard(
+    query_ids: List[str],
+    norm_display_name: Optional[str],
+    threshold: float,
+    top_k: int,
+) -> List[Tuple[float, int, int]]:
+    """Multi-identifier cascaded scan (as in FuzzyMatcher.find_multi_matches)"""
+    hits = []
+    for identity in _shard:
+        candidate_id = identity.get('identifier')
+        if not isinstance(candidate_id, str) or not candidate_id:
+            candidate_id = None
+            if not norm_display_name:
+                continue
+        hit = cascade_confidence(
+            candidate_id.lower() if candidate_id else None,
+            candidate_name(identity),
+            query_ids,
+            norm_display_name,
+            threshold,
+        )
+        if hit:
+            hits.append((hit[0], hit[1], identity['id']))
+    return heapq.nlargest(top_k, hits)
+
+
+class ShardedScorer:
+    """
+    Scatter/gather fuzzy scoring over a persistent pool of shard processes.
+
+    Each shard is a single-process executor, so its slice of the candidate
+    set stays resident in that process between requests. Queries are
+    scattered to every shard, each shard applies the threshold and returns
+    its top-K (confidence, identity id) pairs, and the results are merged.
+    Snapshot-backed candidate sets are loaded by each shard straight from
+    the mapped file instead of being pickled across.
+    """
+
+    def __init__(self, shards: int):
+        self.shards = shards
+        self.version = None
+        self._executors: List[ProcessPoolExecutor] = []
+
+    def _ensure_pool(self):
+        if self._executors:
+            return
+        context = multiprocessing.get_context('spawn')
+        self._executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context)
+            for _ in range(self.shards)
+        ]
+
+    def load(self, candidates: Sequence[Dict[str, Any]], version: Any):
+        """Distribute `candidates` across the shards unless `version` is already loaded"""
+        if version == self.version and self._executors:
+            return
+        self._ensure_pool()
+
+        if isinstance(candidates, IdentitySnapshot):
+            futures = [
+                executor.submit(_load_snapshot_stride, candidates.path, shard, self.shards)
+                for shard, executor in enumerate(self._executors)
+            ]
+        else:
+            rows = [
+                {field: identity.get(field) for field in SHARD_FIELDS}
+                for identity in candidates
+            ]
+            futures = [
+                executor.submit(_load_rows, rows[shard::self.shards])
+                for shard, executor in enumerate(self._executors)
+            ]
+
+        for future in futures:
+            future.result()
+        self.version = version
+
+    def score(
+        self,
+        normalized_id: Optional[str],
+        norm_display_name: Optional[str],
+        threshold: float,
+        top_k: int,
+    ) -> List[Tuple[float, int]]:
+        """Scatter a query to every shard and merge the per-shard top-K"""
+        futures = [
+            executor.submit(_score_shard, normalized_id, norm_display_name, threshold, top_k)
+            for executor in self._executors
+        ]
+        return heapq.nlargest(top_k, (hit for future in futures for hit in future.result()))
+
+    def scan(
+        self,
+        query_ids: List[str],
+        norm_display_name: Optional[str],
+        threshold: float,
+        top_k: int,
+        timeout: Optional[float] = None,
+    ) -> Tuple[List[Tuple[float, int, int]], bool]:
+        """
+        Scatter a multi-identifier scan to every shard
+
+        Shards still running after `timeout` seconds are left out of the
+        merge (they finish in the background).
+
+        Returns: top-K (confidence, index of the best query id or -1,
+            identity id) across the shards that answered, and whether all
+            of them did
+        """
+        futures = [
+            executor.submit(_scan_shard, query_ids, norm_display_name, threshold, top_k)
+            for executor in self._executors
+        ]
+        done, not_done = wait(futures, timeout=timeout)
+        hits = heapq.nlargest(top_k, (hit for future in done for hit in future.result()))
+        return hits, not not_done
+
+    def close(self):
+        for executor in self._executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self._executors = []
+        self.version = None
@@ -0,0 +1,319 @@
+"""
+Memory-mapped identity snapshot shared read-only by all worker processes
+
+File layout (little-endian, arrays 8-byte aligned):
+
+    header      magic, format version, row count, string count,
+                string-blob size, snapshot version
+    ids         int64[rows]   identity id, sorted ascending
+    profile_ids int64[rows]   -1 when the identity is unlinked
+    platform    int32[rows]   string-table index
+    identifier  int32[rows]   string-table index
+    name        int32[rows]   display_name index, -1 when missing
+    canonical   int32[rows]   profile canonical_name index, -1 when missing
+    offsets     int64[strings + 1]
+    blob        utf-8 bytes of the interned string table
+
+Snapshots are written as `snapshot-<version>.bin` and published by
+atomically replacing the `CURRENT` pointer file, so readers swap to a new
+version without coordination. New versions come from a rebuild in one
+worker whenever a write has bumped the shared data version since the
+current snapshot was read (SNAPSHOT_REBUILD_INTERVAL), from gunicorn
+start, or from the command line.
+
+Usage: python -m app.matching.snapshot build [--dir DIR]
+"""
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+import argparse
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from app.config import Config
+from app.database import PAGE_SIZE
+from app.utils import file_lock
+
+MAGIC = b'IUSNAP01'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sIIQQQQ')
+POINTER_FILE = 'CURRENT'
+SNAPSHOT_COLUMNS = 'id, profile_id, platform, identifier, display_name, unified_profiles(canonical_name)'
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class IdentitySnapshot:
+    """
+    Read-only view over a snapshot file.
+
+    Columns are numpy arrays backed by a shared mmap, so every process
+    mapping the same file shares its pages. Rows are decoded into identity
+    dicts only when accessed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, fmt, _, n_rows, n_strings, blob_size, version = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"Not an identity snapshot: {path}")
+
+        self.version = version
+        offset = _align(HEADER.size)
+
+        def column(dtype, count):
+            nonlocal offset
+            array = np.frombuffer(self._mm, dtype=dtype, count=count, offset=offset)
+            offset = _align(offset + array.nbytes)
+            return array
+
+        self.ids = column('<i8', n_rows)
+        self.profile_ids = column('<i8', n_rows)
+        self.platform = column('<i4', n_rows)
+        self.identifier = column('<i4', n_rows)
+        self.name = column('<i4', n_rows)
+        self.canonical = column('<i4', n_rows)
+        self.offsets = column('<i8', n_strings + 1)
+        self._blob_offset = offset
+        self._blob_size = blob_size
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for position in range(len(self.ids)):
+            yield self.row(position)
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        return self.row(position)
+
+    def string(self, index: int) -> Optional[str]:
+        if index < 0:
+            return None
+        start = self._blob_offset + int(self.offsets[index])
+        stop = self._blob_offset + int(self.offsets[index + 1])
+        return self._mm[start:stop].decode('utf-8')
+
+    def row(self, position: int) -> Dict[str, Any]:
+        """Decode the identity stored at `position`"""
+        profile_id = int(self.profile_ids[position])
+        return {
+            'id': int(self.ids[position]),
+            'profile_id': profile_id if profile_id >= 0 else None,
+            'platform': self.string(int(self.platform[position])),
+            'identifier': self.string(int(self.identifier[position])),
+            'display_name': self.string(int(self.name[position])),
+            'unified_profiles': {
+                'canonical_name': self.string(int(self.canonical[position]))
+            },
+        }
+
+    def get(self, row_id: int, default=None) -> Optional[Dict[str, Any]]:
+        """Look up an identity by id (binary search over the sorted ids)"""
+        position = int(np.searchsorted(self.ids, row_id))
+        if position < len(self.ids) and self.ids[position] == row_id:
+            return self.row(position)
+        return default
+
+
+def write_snapshot(rows: Iterable[Dict[str, Any]], path: str, version: int):
+    """Serialize identity rows into the snapshot format at `path`"""
+    rows = sorted(
+        (r for r in rows if r.get('id') is not None),
+        key=lambda r: r['id']
+    )
+    strings: Dict[str, int] = {}
+
+    def intern(value) -> int:
+        if not isinstance(value, str):
+            return -1
+        return strings.setdefault(value, len(strings))
+
+    n_rows = len(rows)
+    ids = np.fromiter((r['id'] for r in rows), dtype='<i8', count=n_rows)
+    profile_ids = np.fromiter(
+        (r['profile_id'] if r.get('profile_id') is not None else -1 for r in rows),
+        dtype='<i8', count=n_rows
+    )
+    platform = np.fromiter((intern(r.get('platform')) for r in rows), dtype='<i4', count=n_rows)
+    identifier = np.fromiter((intern(r.get('identifier')) for r in rows), dtype='<i4', count=n_rows)
+    name = np.fromiter((intern(r.get('display_name')) for r in rows), dtype='<i4', count=n_rows)
+    canonical = np.fromiter(
+        (intern((r.get('unified_profiles') or {}).get('canonical_name')) for r in rows),
+        dtype='<i4', count=n_rows
+    )
+
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = b''.join(encoded)
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, n_rows, len(encoded), len(blob), version))
+        for array in (ids, profile_ids, platform, identifier, name, canonical, offsets):
+            fh.write(b'\0' * (_align(fh.tell()) - fh.tell()))
+            fh.write(array.tobytes())
+        fh.write(b'\0' * (_align(fh.tell()) - fh.tell()))
+        fh.write(blob)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+
+def publish_snapshot(
+    rows: Iterable[Dict[str, Any]],
+    directory: str,
+    keep: int = 2,
+    version: Optional[int] = None,
+) -> str:
+    """
+    Write a new snapshot version into `directory` and point CURRENT at it
+
+    Args:
+        version: unix time in nanoseconds the rows were read at (default: now)
+
+    Returns: path of the published snapshot
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = version or time.time_ns()
+    filename = f'snapshot-{version}.bin'
+    path = os.path.join(directory, filename)
+    write_snapshot(rows, path, version)
+
+    fd, pointer_tmp = tempfile.mkstemp(dir=directory, prefix=f'.{POINTER_FILE}-')
+    with os.fdopen(fd, 'w') as fh:
+        fh.write(filename)
+    os.replace(pointer_tmp, os.path.join(directory, POINTER_FILE))
+
+    # Mapped files stay readable after unlink, so old versions can go
+    published = sorted(f for f in os.listdir(directory) if f.startswith('snapshot-') and f.endswith('.bin'))
+    for stale in published[:-keep]:
+        os.remove(os.path.join(directory, stale))
+    return path
+
+
+class SnapshotManager:
+    """
+    Tracks the CURRENT snapshot of a directory and swaps to new versions.
+
+    The pointer file is checked at most every `check_interval` seconds.
+    With a `rebuild_interval`, a background thread also checks that often
+    whether a write has bumped the shared data version since the current
+    snapshot was read, and if so rebuilds it from the database. Only the
+    worker holding the directory's lock file rebuilds; the others pick the
+    new version up through the pointer file.
+    """
+
+    def __init__(self, directory: str, check_interval: float = 5.0, rebuild_interval: float = 0.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.rebuild_interval = rebuild_interval
+        self._snapshot: Optional[IdentitySnapshot] = None
+        self._pointer_mtime_ns = None
+        self._checked_at = 0.0
+        self._rebuild_pid = None
+
+    def current(self) -> Optional[IdentitySnapshot]:
+        self._start_rebuilder()
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked_at < self.check_interval:
+            return self._snapshot
+        self._checked_at = now
+
+        pointer = os.path.join(self.directory, POINTER_FILE)
+        try:
+            mtime_ns = os.stat(pointer).st_mtime_ns
+            if mtime_ns != self._pointer_mtime_ns:
+                with open(pointer) as fh:
+                    filename = fh.read().strip()
+                self._snapshot = IdentitySnapshot(os.path.join(self.directory, filename))
+                self._pointer_mtime_ns = mtime_ns
+        except (OSError, ValueError) as e:
+            print(f"Error loading identity snapshot: {str(e)}")
+
+        return self._snapshot
+
+    def stale(self) -> bool:
+        """Whether a data version bump happened after the current snapshot was read"""
+        from app.utils.data_version import data_version
+
+        snapshot = self.current()
+        _, modified = data_version.current()
+        # Snapshot versions are the read start time in nanoseconds
+        return snapshot is None or modified * 1e9 >= snapshot.version
+
+    def _start_rebuilder(self):
+        """Start the background rebuild once per process (threads do not survive a fork)"""
+        if self.rebuild_interval <= 0 or self._rebuild_pid == os.getpid():
+            return
+        self._rebuild_pid = os.getpid()
+        threading.Thread(target=self._run_rebuilder, daemon=True).start()
+
+    def _run_rebuilder(self):
+        lock_fd = None
+        while True:
+            time.sleep(self.rebuild_interval)
+            try:
+                if not self.stale():
+                    continue
+                if lock_fd is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    fd = file_lock.open_lock_file(os.path.join(self.directory, 'rebuild.lock'))
+                    if not file_lock.lock(fd, blocking=False):
+                        os.close(fd)
+                        continue
+                    lock_fd = fd
+                build_from_database(self.directory)
+            except Exception as e:
+                print(f"Error rebuilding identity snapshot: {str(e)}")
+
+
+def fetch_identities(db, columns: str = SNAPSHOT_COLUMNS) -> List[Dict[str, Any]]:
+    """Page through platform_identities (by default with the columns a snapshot keeps)"""
+    rows: List[Dict[str, Any]] = []
+    start = 0
+    while True:
+        response = db.table('platform_identities') \
+            .select(columns) \
+            .order('id') \
+            .range(start, start + PAGE_SIZE - 1) \
+            .execute()
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+
+def build_from_database(directory: Optional[str] = None) -> str:
+    """Build and publish a snapshot from the live database"""
+    from app.database import get_db
+
+    directory = directory or Config.SNAPSHOT_DIR
+    if not directory:
+        raise ValueError("SNAPSHOT_DIR is not configured")
+    # Version with the read start, so delta syncs from the snapshot cover
+    # every write made while it was being read
+    started = time.time_ns()
+    return publish_snapshot(fetch_identities(get_db()), directory, version=started)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Identity snapshot builder')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--dir', default=None, help='Snapshot directory (default: SNAPSHOT_DIR)')
+    args = parser.parse_args()
+
+    snapshot_path = build_from_database(args.dir)
+    snapshot = IdentitySnapshot(snapshot_path)
+    print(f"Published {snapshot_path} ({len(snapshot)} identities, version {snapshot.version})")
@@ -0,0 +1,77 @@
+"""
+Data-version counter shared by all worker processes
+"""
+import os
+import tempfile
+import time
+from typing import Tuple
+
+from app.config import Config
+from app.utils import file_lock
+
+
+class DataVersion:
+    """
+    Monotonic counter bumped by every write route.
+
+    The counter lives in a small file so every gunicorn worker sees the
+    same value; readers only re-read it when the file's mtime changes.
+    The first value is seeded from the clock so ETags issued before a
+    restart never collide with new ones.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._cached_key = None
+        self._cached_version = 0
+
+    def _ensure_file(self):
+        if not os.path.exists(self.path):
+            self.bump()
+
+    def current(self) -> Tuple[int, float]:
+        """
+        Returns: (version, last-modified unix timestamp)
+        """
+        self._ensure_file()
+        stat = os.stat(self.path)
+        # Every bump replaces the file, so a new inode or mtime means a new value
+        key = (stat.st_ino, stat.st_mtime_ns)
+        if key != self._cached_key:
+            with open(self.path, 'r') as fh:
+                content = fh.read().strip()
+            self._cached_version = int(content) if content else 0
+            self._cached_key = key
+        return self._cached_version, stat.st_mtime
+
+    def bump(self) -> int:
+        """
+        Increment the shared version and return the new value
+
+        Writers serialize on a separate lock file; the value is written to
+        a temporary file and renamed over the version file, so readers
+        never see a partly written value.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        lock_fd = file_lock.open_lock_file(f'{self.path}.lock')
+        try:
+            file_lock.lock(lock_fd)
+            try:
+                with open(self.path, 'r') as fh:
+                    content = fh.read().strip()
+            except FileNotFoundError:
+                content = ''
+            version = int(content) + 1 if content else int(time.time() * 1000)
+
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.data-version-')
+            try:
+                os.write(fd, str(version).encode())
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, self.path)
+        finally:
+            file_lock.release(lock_fd)
+        return version
+
+data_version = DataVersion(Config.DATA_VERSION_PATH)
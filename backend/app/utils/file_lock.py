@@ -0,0 +1,56 @@
+"""
+Advisory file locks shared by worker processes
+
+flock on POSIX; on Windows (no fcntl) a one-byte msvcrt lock, where
+shared locks are taken as exclusive ones.
+"""
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def open_lock_file(path: str) -> int:
+    """Open (creating if needed) a lock file and return its descriptor"""
+    return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+def lock(fd: int, blocking: bool = True, shared: bool = False) -> bool:
+    """
+    Lock an open lock file
+
+    Returns: False when `blocking` is off and another holder has the lock
+    """
+    if fcntl is not None:
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(fd, flags if blocking else flags | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    os.lseek(fd, 0, os.SEEK_SET)
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.01)
+
+
+def release(fd: int):
+    """Unlock and close a lock file"""
+    try:
+        if fcntl is None:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
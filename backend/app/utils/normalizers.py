@@ -76,3 +76,26 @@ def normalize_username(username: Optional[str]) -> Optional[str]:
     if username_clean.startswith('@'):
         username_clean = username_clean[1:]
     return username_clean if username_clean else None
+
+
+GMAIL_DOMAINS = {'gmail.com', 'googlemail.com'}
+
+
+def canonicalize_email(email: Optional[str]) -> Optional[tuple[str, str]]:
+    """
+    Canonicalize email address for alias matching:
+    - Lowercase and trim
+    - Drop plus-address tags (sara+news@x.com -> sara@x.com)
+    - Drop dots in Gmail local parts and fold googlemail.com into gmail.com
+    Returns: (local_part, domain)
+    """
+    if not isinstance(email, str) or '@' not in email:
+        return None
+    local, _, domain = email.strip().lower().rpartition('@')
+    local = local.split('+', 1)[0]
+    if domain in GMAIL_DOMAINS:
+        local = local.replace('.', '')
+        domain = 'gmail.com'
+    if not local or not domain:
+        return None
+    return local, domain
@@ -0,0 +1,183 @@
+"""
+Shared cache of unified profiles with their linked identities
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.config import Config
+from app.database import IN_CHUNK_SIZE
+from app.utils import file_lock
+
+# The invalidation log starts over once it grows past this many bytes
+LOG_MAX_BYTES = 1 << 20
+
+
+class ProfileCache:
+    """
+    Profiles keyed by id, each fetched with its identities in one embedded
+    query (`*, platform_identities(*)`).
+
+    Writes that change a profile or its identities call `invalidate` with
+    the profile ids, which appends them to a log file shared by all worker
+    processes; every lookup first drops the entries named by lines added
+    since the last one, so a write only evicts the profiles it touched.
+    A read that overlaps a write is not stored when the write's ids are
+    logged before it completes, and is dropped at the next lookup
+    otherwise. When the log starts over, every entry is dropped. Entries
+    also expire after PROFILE_CACHE_TTL seconds (the bound for writes made
+    outside the API) and the least recently used are evicted past
+    PROFILE_CACHE_SIZE.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, log_path: str):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.log_path = log_path
+        self._entries: 'OrderedDict[int, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._log_seen = False
+        self._log_inode = None
+        self._log_offset = 0
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def db(self):
+        if self._db is None:
+            from app.database import get_db
+            self._db = get_db()
+        return self._db
+
+    def get(self, profile_id: int) -> Optional[Dict[str, Any]]:
+        """Profile with `platform_identities`, or None if it does not exist"""
+        return self.get_many([profile_id]).get(profile_id)
+
+    def get_many(self, profile_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Profiles by id; all misses are fetched together in one query
+
+        Returns: {profile_id: profile} for the ids that exist (copies, safe
+            to modify at the top level)
+        """
+        now = time.monotonic()
+        found: Dict[int, Dict[str, Any]] = {}
+        missing: List[int] = []
+
+        with self._lock:
+            self._sync()
+            for profile_id in dict.fromkeys(profile_ids):
+                entry = self._entries.get(profile_id)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(profile_id)
+                    found[profile_id] = dict(entry[1])
+                    self.hits += 1
+                else:
+                    missing.append(profile_id)
+                    self.misses += 1
+
+        if missing:
+            profiles = self._fetch(missing)
+            with self._lock:
+                # Profiles written while they were being read are not kept
+                written = self._sync()
+                for profile in profiles:
+                    found[profile['id']] = dict(profile)
+                    if written is not None and profile['id'] not in written:
+                        self._store(profile, now)
+
+        return found
+
+    def invalidate(self, profile_ids: Iterable[int]):
+        """Drop the given profiles in every worker process"""
+        ids = sorted({int(profile_id) for profile_id in profile_ids if profile_id is not None})
+        if not ids:
+            return
+
+        lock_fd = file_lock.open_lock_file(f'{self.log_path}.lock')
+        try:
+            file_lock.lock(lock_fd)
+            try:
+                if os.path.getsize(self.log_path) > LOG_MAX_BYTES:
+                    # A new file (new inode) makes every reader drop everything
+                    os.remove(self.log_path)
+            except FileNotFoundError:
+                pass
+            with open(self.log_path, 'a') as fh:
+                fh.write(''.join(f'{profile_id}\n' for profile_id in ids))
+        finally:
+            file_lock.release(lock_fd)
+
+        with self._lock:
+            for profile_id in ids:
+                self._entries.pop(profile_id, None)
+
+    def _sync(self) -> Optional[Set[int]]:
+        """
+        Apply invalidations logged since the last call (lock held)
+
+        Returns: the ids dropped, or None when everything was dropped
+        """
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            stat = None
+
+        inode = stat.st_ino if stat else None
+        if not self._log_seen:
+            # Nothing is cached yet, so earlier lines do not matter
+            self._log_seen = True
+            self._log_inode = inode
+            self._log_offset = stat.st_size if stat else 0
+            return set()
+        # A shrunk file is a new one that reused the inode number
+        if inode != self._log_inode or (stat and stat.st_size < self._log_offset):
+            started_over = self._log_inode is not None
+            self._log_inode = inode
+            self._log_offset = 0
+            if started_over:
+                self._entries.clear()
+                return None
+        if stat is None or stat.st_size <= self._log_offset:
+            return set()
+
+        with open(self.log_path, 'rb') as fh:
+            fh.seek(self._log_offset)
+            chunk = fh.read(stat.st_size - self._log_offset)
+        # Stop at the last complete line; a line still being written is read next time
+        complete = chunk[:chunk.rfind(b'\n') + 1]
+        self._log_offset += len(complete)
+
+        written = {int(line) for line in complete.split()}
+        for profile_id in written:
+            self._entries.pop(profile_id, None)
+        return written
+
+    def _fetch(self, profile_ids: List[int]) -> List[Dict[str, Any]]:
+        profiles: List[Dict[str, Any]] = []
+        for start in range(0, len(profile_ids), IN_CHUNK_SIZE):
+            response = self.db.table('unified_profiles') \
+                .select('*, platform_identities(*)') \
+                .in_('id', profile_ids[start:start + IN_CHUNK_SIZE]) \
+                .execute()
+            profiles.extend(response.data or [])
+        return profiles
+
+    def _store(self, profile: Dict[str, Any], now: float):
+        """Cache a profile (lock held)"""
+        if self.max_entries <= 0:
+            return
+        self._entries[profile['id']] = (now + self.ttl, profile)
+        self._entries.move_to_end(profile['id'])
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+profile_cache = ProfileCache(
+    Config.PROFILE_CACHE_SIZE,
+    Config.PROFILE_CACHE_TTL,
+    Config.PROFILE_INVALIDATION_PATH
+)
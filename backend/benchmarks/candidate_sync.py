@@ -0,0 +1,122 @@
+"""
+Candidate store delta-sync benchmark
+
+Runs fuzzy /match lookups against the in-memory stand-in database while a
+share of the requests write (new identities, re-links, renames), once
+reading the whole identity table per request and once through the
+candidate store, and reports database rows and queries per request and
+the lookup latency. Both runs must return the same matches.
+
+Usage: python -m benchmarks.candidate_sync [--profiles 5000] [--requests 300]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.config import Config
+
+Config.DATA_VERSION_PATH = os.path.join(tempfile.mkdtemp(prefix='candidate-sync-'), 'data-version')
+
+from app.database import SupabaseClient  # noqa: E402
+from app.utils.data_version import data_version  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase, seed_tables  # noqa: E402
+
+
+def build_db(n_profiles: int) -> FakeSupabase:
+    """Seeded tables, timestamped a day back so they predate the run"""
+    tables = seed_tables(n_profiles)
+    seeded_at = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    for rows in tables.values():
+        for row in rows:
+            row['created_at'] = row['updated_at'] = seeded_at
+    return FakeSupabase(tables)
+
+
+def write(db: FakeSupabase, rng: random.Random, n_profiles: int):
+    """One write of the kind the API makes, followed by the version bump"""
+    kind = rng.choice(['insert', 'relink', 'rename'])
+    if kind == 'insert':
+        db.table('platform_identities').insert({
+            'profile_id': rng.randint(1, n_profiles),
+            'platform': 'instagram',
+            'identifier': f'new_handle_{rng.randrange(10 ** 6)}',
+            'display_name': None,
+        }).execute()
+    elif kind == 'relink':
+        identity = rng.choice(db.tables['platform_identities'])
+        db.table('platform_identities') \
+            .update({'profile_id': rng.randint(1, n_profiles)}) \
+            .eq('id', identity['id']) \
+            .execute()
+    else:
+        db.table('unified_profiles') \
+            .update({'canonical_name': f'Renamed {rng.randrange(10 ** 6)}'}) \
+            .eq('id', rng.randint(1, n_profiles)) \
+            .execute()
+    data_version.bump()
+
+
+def run_mode(use_store: bool, args, queries):
+    from app.matching.candidate_store import CandidateStore
+    from app.matching.fuzzy_matcher import FuzzyMatcher
+
+    db = build_db(args.profiles)
+    SupabaseClient._instance = db
+    Config.CANDIDATE_STORE = use_store
+    store = CandidateStore(0, Config.CANDIDATE_SYNC_OVERLAP, 300, Config.CANDIDATE_LOG_SIZE) \
+        if use_store else None
+    matcher = FuzzyMatcher(store=store)
+
+    rng = random.Random(args.seed)
+    matcher.find_multi_matches(*queries[0])  # initial load and index build
+    rows_before, queries_before = db.rows_returned, db.queries
+    results = []
+    elapsed = 0.0
+
+    for i in range(args.requests):
+        if rng.random() < args.write_share:
+            write(db, rng, args.profiles)
+        identifiers, name = queries[i % len(queries)]
+        start = time.perf_counter()
+        matches = matcher.find_multi_matches(identifiers, name)
+        elapsed += time.perf_counter() - start
+        results.append([(m['profile_id'], m['confidence']) for m in matches])
+
+    return {
+        'rows': (db.rows_returned - rows_before) / args.requests,
+        'queries': (db.queries - queries_before) / args.requests,
+        'ms': elapsed * 1000 / args.requests,
+        'results': results,
+        'stats': store.stats if store else None,
+    }
+
+
+def run(args):
+    db = build_db(args.profiles)
+    rng = random.Random(args.seed)
+    sample = rng.sample(db.tables['platform_identities'], 20)
+    queries = [({row['platform']: row['identifier'][:-1]}, row.get('display_name')) for row in sample]
+
+    full = run_mode(False, args, queries)
+    synced = run_mode(True, args, queries)
+    assert full['results'] == synced['results'], 'candidate store changed the matches'
+
+    identities = len(db.tables['platform_identities'])
+    print(f"{identities} identities, {args.requests} lookups, {args.write_share:.0%} preceded by a write")
+    print(f"{'candidates':<16} {'rows/req':>10} {'queries/req':>12} {'ms/req':>8}")
+    for label, result in (('full table read', full), ('candidate store', synced)):
+        print(f"{label:<16} {result['rows']:>10.1f} {result['queries']:>12.2f} {result['ms']:>8.1f}")
+    print('\nidentical matches: yes')
+    print(f"store: {synced['stats']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Candidate store delta-sync benchmark')
+    parser.add_argument('--profiles', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--write-share', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=3)
+    run(parser.parse_args())
@@ -0,0 +1,100 @@
+"""
+Cascaded fuzzy scoring benchmark
+
+Scores queries against a synthetic candidate set with the exhaustive
+scorer and with the cascaded early-exit scorer, checks that both agree on
+every candidate at or above the threshold, and reports the time taken
+and the fraction of candidates pruned at each cascade stage.
+
+Usage: python -m benchmarks.cascade_scoring [--rows 50000] [--threshold 0.65]
+"""
+import argparse
+import random
+import time
+
+from app.matching.scoring import CASCADE_STAGES, score_identity
+from app.utils.normalizers import normalize_name
+from benchmarks.fake_supabase import candidate_rows, random_word
+
+QUERIES = [
+    ('sarajohnson', 'Sara Johnson'),
+    ('mike_travels', 'Mike Brown'),
+    ('priya.sharma', None),
+    (None, 'Rahul Verma'),
+]
+
+
+def _typo(rng: random.Random, text: str) -> str:
+    i = rng.randrange(1, len(text) - 1)
+    return text[:i] + text[i + 1:]
+
+
+def build_rows(n_rows: int, seed: int = 13):
+    """Seeded identities plus a few near-duplicates of every query"""
+    rng = random.Random(seed)
+    rows = candidate_rows(n_rows, seed)
+    for identifier, name in QUERIES:
+        for _ in range(5):
+            rows.append({
+                'id': len(rows) + 1,
+                'profile_id': len(rows) + 1,
+                'platform': 'dashboard',
+                'identifier': _typo(rng, identifier or random_word(rng, 8)),
+                'display_name': _typo(rng, name) if name else None,
+                'unified_profiles': {'canonical_name': name},
+            })
+    return rows
+
+
+def run(n_rows: int, threshold: float, repeat: int):
+    rows = build_rows(n_rows)
+    print(f'{len(rows)} candidates, threshold {threshold}')
+    print(f"{'query':<28} {'exhaustive ms':>14} {'cascade ms':>11} {'speedup':>8} {'matches':>8}")
+
+    totals = {stage: 0 for stage in CASCADE_STAGES}
+    totals['scored'] = 0
+    scored_rows = 0
+
+    for identifier, name in QUERIES:
+        norm_name = normalize_name(name) if name else None
+
+        best_exhaustive = best_cascade = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            exhaustive = [score_identity(r, identifier, norm_name) for r in rows]
+            best_exhaustive = min(best_exhaustive, time.perf_counter() - start)
+
+            stats = {}
+            start = time.perf_counter()
+            cascaded = [score_identity(r, identifier, norm_name, threshold, stats) for r in rows]
+            best_cascade = min(best_cascade, time.perf_counter() - start)
+
+        for full, fast in zip(exhaustive, cascaded):
+            if full >= threshold:
+                assert fast == full, f'cascade {fast!r} != exhaustive {full!r}'
+            else:
+                assert fast < threshold, f'cascade accepted a row scoring {full!r}'
+
+        for stage, count in stats.items():
+            totals[stage] += count
+        scored_rows += len(rows)
+
+        label = f'{identifier or "-"} / {name or "-"}'
+        matches = sum(1 for score in exhaustive if score >= threshold)
+        print(f'{label:<28} {best_exhaustive * 1000:14.1f} {best_cascade * 1000:11.1f} '
+              f'{best_exhaustive / best_cascade:8.2f} {matches:8d}')
+
+    print('\nidentical above threshold: yes')
+    print('fraction of candidates pruned per stage:')
+    for stage in CASCADE_STAGES:
+        print(f'  {stage:<11} {totals[stage] / scored_rows:7.2%}')
+    print(f"  {'fully scored':<11} {totals['scored'] / scored_rows:7.2%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cascaded fuzzy scoring benchmark')
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--threshold', type=float, default=0.65)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+    run(args.rows, args.threshold, args.repeat)
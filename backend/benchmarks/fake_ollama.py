@@ -0,0 +1,197 @@
+"""
+Fake Ollama server reproducing model load and token timing
+
+Implements POST /api/generate (streaming and non-streaming) well enough
+for the ollama Python client:
+- the model is "loaded" on first use, or after its keep_alive lapses,
+  which costs --load-ms
+- every prompt pays --prompt-ms before the first token, then each token
+  costs --token-ms
+- prompts asking for a "detailed explanation" get a long reasoning;
+  unconstrained output (no `format`) trails chatter after the JSON
+- options.num_predict caps the tokens, and a client closing the stream
+  stops generation
+- at most --parallel requests generate at once (OLLAMA_NUM_PARALLEL);
+  the rest queue
+
+Usage: python -m benchmarks.fake_ollama [--port 11434] [--token-ms 20]
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+import argparse
+import json
+import re
+import threading
+import time
+
+DEFAULT_KEEP_ALIVE_SECONDS = 300
+CHARS_PER_TOKEN = 4
+
+SHORT_REASONING = 'Names and identifiers differ, so these look like different people.'
+DETAILED_REASONING = ' '.join([
+    'The first identity uses a different platform and the identifier shares no',
+    'distinctive substring with the second one. The display names are unrelated',
+    'in spelling and pronunciation, there is no common domain, handle stem or',
+    'phone fragment, and nothing suggests a nickname, transliteration or typo.',
+    'Without any overlapping attribute the most reasonable conclusion is that',
+    'the two records describe different people, although additional context',
+    'such as shared contacts or activity times could change this assessment.'
+])
+TRAILING_CHATTER = (
+    '\n\nNote: this assessment is based only on the fields provided above and '
+    'may change if more information about either identity becomes available.'
+)
+
+
+def _keep_alive_seconds(value) -> float:
+    if value is None:
+        return DEFAULT_KEEP_ALIVE_SECONDS
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smh]?)', str(value).strip())
+    if not match:
+        return DEFAULT_KEEP_ALIVE_SECONDS
+    return float(match.group(1)) * {'': 1, 's': 1, 'm': 60, 'h': 3600}[match.group(2)]
+
+
+def _tokens(text: str) -> List[str]:
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+
+class FakeOllama:
+    """Shared model state and timing parameters"""
+
+    def __init__(self, load_ms: float, prompt_ms: float, token_ms: float, parallel: int = 1):
+        self.load_ms = load_ms
+        self.prompt_ms = prompt_ms
+        self.token_ms = token_ms
+        self.slots = threading.BoundedSemaphore(parallel)
+        self.loaded_until = 0.0
+        self.loads = 0
+        self.tokens_generated = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def ensure_loaded(self, keep_alive):
+        with self.lock:
+            now = time.monotonic()
+            if now >= self.loaded_until:
+                time.sleep(self.load_ms / 1000.0)
+                self.loads += 1
+            self.loaded_until = time.monotonic() + _keep_alive_seconds(keep_alive)
+
+    def completion(self, prompt: str, constrained: bool) -> str:
+        reasoning = DETAILED_REASONING if 'detailed explanation' in prompt else SHORT_REASONING
+        body = json.dumps({'is_match': False, 'confidence': 0.2, 'reasoning': reasoning}, indent=1)
+        return body if constrained else '```json\n' + body + '\n```' + TRAILING_CHATTER
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = 'FakeOllama/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def handle(self):
+        # Clients dropping keep-alive or early-stopped connections is expected
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        fake: FakeOllama = self.server.fake
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if self.path != '/api/generate':
+            self._send_json({'error': 'not found'}, 404)
+            return
+
+        with fake.lock:
+            fake.requests += 1
+        model = request.get('model', '')
+        fake.ensure_loaded(request.get('keep_alive'))
+
+        prompt = request.get('prompt') or ''
+        if not prompt:
+            self._send_json({'model': model, 'response': '', 'done': True, 'done_reason': 'load'})
+            return
+
+        num_predict: Optional[int] = (request.get('options') or {}).get('num_predict')
+        tokens = _tokens(fake.completion(prompt, bool(request.get('format'))))
+        if num_predict and num_predict > 0:
+            tokens = tokens[:num_predict]
+
+        with fake.slots:
+            time.sleep(fake.prompt_ms / 1000.0)
+            if request.get('stream', True):
+                self._stream(model, tokens)
+            else:
+                time.sleep(fake.token_ms * len(tokens) / 1000.0)
+                with fake.lock:
+                    fake.tokens_generated += len(tokens)
+                self._send_json({'model': model, 'response': ''.join(tokens), 'done': True, 'done_reason': 'stop'})
+
+    def _stream(self, model: str, tokens: List[str]):
+        fake: FakeOllama = self.server.fake
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def write_chunk(payload: dict):
+            line = json.dumps(payload).encode() + b'\n'
+            self.wfile.write(f'{len(line):x}\r\n'.encode() + line + b'\r\n')
+            self.wfile.flush()
+
+        try:
+            for token in tokens:
+                time.sleep(fake.token_ms / 1000.0)
+                write_chunk({'model': model, 'response': token, 'done': False})
+                with fake.lock:
+                    fake.tokens_generated += 1
+            write_chunk({'model': model, 'response': '', 'done': True, 'done_reason': 'stop'})
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # Client stopped reading: stop generating
+            self.close_connection = True
+
+
+def start_server(
+    port: int = 0,
+    load_ms: float = 1500,
+    prompt_ms: float = 60,
+    token_ms: float = 20,
+    parallel: int = 1,
+) -> ThreadingHTTPServer:
+    """Start a fake Ollama server in a background thread; `server.fake` holds its stats"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    server.fake = FakeOllama(load_ms, prompt_ms, token_ms, parallel)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--load-ms', type=float, default=1500)
+    parser.add_argument('--prompt-ms', type=float, default=60)
+    parser.add_argument('--token-ms', type=float, default=20)
+    parser.add_argument('--parallel', type=int, default=1)
+    args = parser.parse_args()
+
+    fake_server = start_server(args.port, args.load_ms, args.prompt_ms, args.token_ms, args.parallel)
+    print(f'Fake Ollama listening on http://127.0.0.1:{fake_server.server_address[1]}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake_server.shutdown()
@@ -0,0 +1,369 @@
+"""
+In-memory stand-in for the Supabase client used by the API
+
+Covers the PostgREST query surface the backend uses: select with embedded
+relations (`*, platform_identities(*)`, `unified_profiles(canonical_name)`,
+`platform_identities(count)`), count='exact', eq/neq/in_/gte/lte/or_,
+order, range/limit, insert, update, upsert and delete. An optional
+per-query delay stands in for the database round trip, and `max_rows`
+caps every response the way PostgREST's db-max-rows does (1000 on
+Supabase).
+
+Install it before the app is created:
+
+    from app.database import SupabaseClient
+    SupabaseClient._instance = FakeSupabase(seed_tables(...))
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import copy
+import itertools
+import random
+import re
+import string
+import threading
+import time
+
+# Embeddable relations: (table, embedded) -> (local column, remote column, to-many)
+RELATIONS = {
+    ('unified_profiles', 'platform_identities'): ('id', 'profile_id', True),
+    ('platform_identities', 'unified_profiles'): ('profile_id', 'id', False),
+    ('match_candidates', 'platform_identities'): ('source_identity_id', 'id', False),
+    ('match_candidates', 'unified_profiles'): ('target_profile_id', 'id', False),
+}
+
+PLATFORMS = ['email', 'whatsapp', 'dashboard', 'instagram']
+DOMAINS = ['gmail.com', 'yahoo.com', 'outlook.com', 'xyz.com']
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _touch(row: Dict[str, Any], payload: Dict[str, Any]):
+    """Stamp updated_at unless the write sets it (a stale copied value is kept)"""
+    if 'updated_at' not in payload:
+        row['updated_at'] = _now()
+
+
+def _split_columns(columns: str) -> List[str]:
+    """Split a select list on top-level commas"""
+    parts, depth, current = [], 0, ''
+    for char in columns:
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _coerce(value: str) -> Any:
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+class FakeResponse:
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """Chainable query builder mirroring the postgrest-py API"""
+
+    def __init__(self, db: 'FakeSupabase', table: str):
+        self.db = db
+        self.table = table
+        self.columns = '*'
+        self.count = None
+        self.filters = []
+        self.ordering: Optional[Tuple[str, bool]] = None
+        self.window: Optional[Tuple[int, int]] = None
+        self.action = 'select'
+        self.payload: Any = None
+
+    # --- actions ---
+
+    def select(self, columns: str = '*', count: Optional[str] = None) -> 'FakeQuery':
+        self.columns = columns
+        self.count = count
+        return self
+
+    def insert(self, payload) -> 'FakeQuery':
+        self.action, self.payload = 'insert', payload
+        return self
+
+    def update(self, payload: Dict[str, Any]) -> 'FakeQuery':
+        self.action, self.payload = 'update', payload
+        return self
+
+    def upsert(self, payload) -> 'FakeQuery':
+        self.action, self.payload = 'upsert', payload
+        return self
+
+    def delete(self) -> 'FakeQuery':
+        self.action = 'delete'
+        return self
+
+    # --- filters and modifiers ---
+
+    def eq(self, column: str, value) -> 'FakeQuery':
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column: str, value) -> 'FakeQuery':
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def in_(self, column: str, values) -> 'FakeQuery':
+        allowed = set(values)
+        self.filters.append(lambda row: row.get(column) in allowed)
+        return self
+
+    def gte(self, column: str, value) -> 'FakeQuery':
+        self.filters.append(lambda row: row.get(column) is not None and row[column] >= value)
+        return self
+
+    def lte(self, column: str, value) -> 'FakeQuery':
+        self.filters.append(lambda row: row.get(column) is not None and row[column] <= value)
+        return self
+
+    def or_(self, expression: str) -> 'FakeQuery':
+        """Supports `col.eq.v`, `col.gte.v` and `col.in.(a,b)` terms"""
+        terms = re.findall(r'(\w+)\.(eq|gte|in)\.(\([^)]*\)|[^,]+)', expression)
+        conditions = []
+        for column, op, value in terms:
+            if op == 'in':
+                allowed = {_coerce(v) for v in value.strip('()').split(',') if v}
+                conditions.append(lambda row, c=column, a=allowed: row.get(c) in a)
+            elif op == 'gte':
+                conditions.append(
+                    lambda row, c=column, v=_coerce(value): row.get(c) is not None and row[c] >= v
+                )
+            else:
+                conditions.append(lambda row, c=column, v=_coerce(value): row.get(c) == v)
+        self.filters.append(lambda row: any(condition(row) for condition in conditions))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> 'FakeQuery':
+        self.ordering = (column, desc)
+        return self
+
+    def range(self, start: int, end: int) -> 'FakeQuery':
+        self.window = (start, end)
+        return self
+
+    def limit(self, size: int) -> 'FakeQuery':
+        self.window = (0, size - 1)
+        return self
+
+    def execute(self) -> FakeResponse:
+        if self.db.latency_ms:
+            time.sleep(self.db.latency_ms / 1000.0)
+        with self.db.lock:
+            self.db.queries += 1
+            return getattr(self, f'_execute_{self.action}')()
+
+    # --- execution ---
+
+    def _matching(self) -> List[Dict[str, Any]]:
+        return [row for row in self.db.tables[self.table] if all(f(row) for f in self.filters)]
+
+    def _execute_select(self) -> FakeResponse:
+        rows = self._matching()
+        total = len(rows)
+        if self.ordering:
+            column, desc = self.ordering
+            rows = sorted(rows, key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        if self.window:
+            rows = rows[self.window[0]:self.window[1] + 1]
+        if self.db.max_rows is not None:
+            rows = rows[:self.db.max_rows]
+        groups: Dict[Tuple[str, str], Dict[Any, List[Dict[str, Any]]]] = {}
+        data = [self.db.project(self.table, row, self.columns, groups) for row in rows]
+        self.db.rows_returned += len(data)
+        return FakeResponse(data, total if self.count else None)
+
+    def _execute_insert(self) -> FakeResponse:
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        return FakeResponse([self.db.insert_row(self.table, row) for row in rows])
+
+    def _execute_update(self) -> FakeResponse:
+        updated = []
+        for row in self._matching():
+            row.update(self.payload)
+            _touch(row, self.payload)
+            updated.append(copy.deepcopy(row))
+        return FakeResponse(updated)
+
+    def _execute_upsert(self) -> FakeResponse:
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        by_id = self.db.by_id[self.table]
+        written = []
+        for row in rows:
+            existing = by_id.get(row.get('id'))
+            if existing is None:
+                written.append(self.db.insert_row(self.table, row))
+            else:
+                existing.update(row)
+                _touch(existing, row)
+                written.append(copy.deepcopy(existing))
+        return FakeResponse(written)
+
+    def _execute_delete(self) -> FakeResponse:
+        doomed = self._matching()
+        doomed_ids = {id(row) for row in doomed}
+        self.db.tables[self.table] = [r for r in self.db.tables[self.table] if id(r) not in doomed_ids]
+        for row in doomed:
+            self.db.by_id[self.table].pop(row.get('id'), None)
+        return FakeResponse([copy.deepcopy(row) for row in doomed])
+
+
+class FakeSupabase:
+    """Thread-safe in-memory tables with the Supabase client's `table()` entry point"""
+
+    def __init__(
+        self,
+        tables: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        latency_ms: float = 0.0,
+        max_rows: Optional[int] = None,
+    ):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {
+            'unified_profiles': [], 'platform_identities': [], 'match_candidates': []
+        }
+        self.tables.update(tables or {})
+        self.by_id = {
+            name: {row['id']: row for row in rows} for name, rows in self.tables.items()
+        }
+        self.sequences = {
+            name: itertools.count(max(self.by_id[name], default=0) + 1) for name in self.tables
+        }
+        self.latency_ms = latency_ms
+        self.max_rows = max_rows
+        self.lock = threading.RLock()
+        self.queries = 0
+        self.rows_returned = 0
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def insert_row(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        stored = dict(row)
+        if stored.get('id') is None:
+            stored['id'] = next(self.sequences[table])
+        stored.setdefault('created_at', _now())
+        stored.setdefault('updated_at', stored['created_at'])
+        self.tables[table].append(stored)
+        self.by_id[table][stored['id']] = stored
+        return copy.deepcopy(stored)
+
+    def project(
+        self,
+        table: str,
+        row: Dict[str, Any],
+        columns: str,
+        groups: Dict[Tuple[str, str], Dict[Any, List[Dict[str, Any]]]],
+    ) -> Dict[str, Any]:
+        """Apply a select list, resolving embedded relations (`groups` memoizes to-many joins)"""
+        result: Dict[str, Any] = {}
+        for column in _split_columns(columns):
+            embed = re.fullmatch(r'(\w+)\((.*)\)', column)
+            if embed is None:
+                if column == '*':
+                    result.update(copy.deepcopy(row))
+                else:
+                    result[column] = copy.deepcopy(row.get(column))
+                continue
+
+            name, inner = embed.groups()
+            local, remote, to_many = RELATIONS[(table, name)]
+            key = row.get(local)
+            if to_many:
+                if (name, remote) not in groups:
+                    grouped = groups[(name, remote)] = {}
+                    for r in self.tables[name]:
+                        grouped.setdefault(r.get(remote), []).append(r)
+                related = groups[(name, remote)].get(key, []) if key is not None else []
+                if inner.strip() == 'count':
+                    result[name] = [{'count': len(related)}]
+                else:
+                    result[name] = [self.project(name, r, inner, groups) for r in related]
+            else:
+                target = self.by_id[name].get(key) if remote == 'id' else None
+                result[name] = self.project(name, target, inner, groups) if target else None
+        return result
+
+
+def random_word(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def seed_tables(
+    n_profiles: int,
+    seed: int = 5,
+    candidate_ratio: float = 0.1,
+    identities_per_profile: Optional[int] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Synthetic profiles with 1-3 identities each, or `identities_per_profile`
+    (normalized identifiers), and pending match candidates for a fraction
+    of the identities
+    """
+    rng = random.Random(seed)
+    created = _now()
+    profiles, identities, candidates = [], [], []
+
+    for profile_id in range(1, n_profiles + 1):
+        first, last = random_word(rng, rng.randint(4, 7)), random_word(rng, rng.randint(5, 9))
+        name = f'{first.title()} {last.title()}'
+        profiles.append({
+            'id': profile_id, 'canonical_name': name, 'status': 'active',
+            'merged_into': None, 'created_at': created, 'updated_at': created,
+        })
+        if identities_per_profile is None:
+            platforms = rng.sample(PLATFORMS, rng.randint(1, 3))
+        else:
+            platforms = [rng.choice(PLATFORMS) for _ in range(identities_per_profile)]
+        for platform in platforms:
+            if platform == 'email':
+                identifier = f'{first}.{last}@{rng.choice(DOMAINS)}'
+            elif platform == 'whatsapp':
+                identifier = f'+919{rng.randint(100000000, 999999999)}'
+            else:
+                identifier = f'{first}_{last}{rng.randint(1, 99)}'
+            identities.append({
+                'id': len(identities) + 1, 'profile_id': profile_id, 'platform': platform,
+                'identifier': identifier, 'display_name': name, 'confidence_score': 1.0,
+                'verified': True, 'created_at': created, 'updated_at': created,
+            })
+
+    for identity in rng.sample(identities, int(len(identities) * candidate_ratio)):
+        candidates.append({
+            'id': len(candidates) + 1, 'source_identity_id': identity['id'],
+            'target_profile_id': rng.randint(1, n_profiles), 'match_type': 'fuzzy',
+            'confidence_score': round(rng.uniform(0.5, 0.85), 2), 'match_details': {},
+            'status': 'pending', 'reviewed_by': None, 'reviewed_at': None,
+            'created_at': created, 'updated_at': created,
+        })
+
+    return {'unified_profiles': profiles, 'platform_identities': identities, 'match_candidates': candidates}
+
+
+def candidate_rows(n_rows: int, seed: int = 5) -> List[Dict[str, Any]]:
+    """
+    `n_rows` seeded identities shaped like the matchers' candidate reads
+    (`*, unified_profiles(canonical_name)`)
+    """
+    tables = seed_tables(n_rows // 2 + 1, seed, candidate_ratio=0, identities_per_profile=2)
+    names = {profile['id']: profile['canonical_name'] for profile in tables['unified_profiles']}
+    return [
+        {**identity, 'unified_profiles': {'canonical_name': names[identity['profile_id']]}}
+        for identity in tables['platform_identities'][:n_rows]
+    ]
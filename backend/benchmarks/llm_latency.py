@@ -0,0 +1,106 @@
+"""
+LLM matching latency benchmark against the fake Ollama server
+
+Compares the previous call pattern (free-text prompt with a detailed
+explanation, no format, no token cap, no keep_alive, non-streaming) with
+the tuned LlmMatcher (JSON schema output, num_predict cap, short reasoning,
+streaming early stop, keep_alive and a warm-up call).
+
+Usage: python -m benchmarks.llm_latency [--calls 10] [--token-ms 20] [--idle-s 0]
+"""
+import argparse
+import statistics
+import time
+
+import ollama
+
+from app.config import Config
+from benchmarks.fake_ollama import start_server
+
+SOURCE = {'platform': 'email', 'identifier': 'sara.johnson@xyz.com', 'display_name': 'Sara Johnson'}
+TARGET = {'platform': 'instagram', 'identifier': 'mike_travels', 'display_name': 'Mike Brown'}
+
+BASELINE_PROMPT = """
+        Determine if these two identities represent the same person.
+
+        Identity 1:
+        - Platform: email
+        - Identifier: sara.johnson@xyz.com
+        - Name: Sara Johnson
+
+        Identity 2:
+        - Platform: instagram
+        - Identifier: mike_travels
+        - Name: Mike Brown
+
+        Respond ONLY with a JSON containing keys:
+        {
+          "is_match": true or false,
+          "confidence": float between 0.0 and 1.0,
+          "reasoning": "detailed explanation"
+        }
+        """
+
+
+def _measure(call, calls: int, idle_s: float):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(idle_s)
+    return latencies
+
+
+def _report(name: str, latencies, fake, tokens_before: int, loads_before: int, calls: int):
+    tokens = (fake.tokens_generated - tokens_before) / calls
+    print(f'{name:>9} {latencies[0]:9.0f} {statistics.mean(latencies[1:] or latencies):9.0f} '
+          f'{statistics.median(latencies):9.0f} {tokens:8.1f} {fake.loads - loads_before:6d}')
+
+
+def run(calls: int, load_ms: float, prompt_ms: float, token_ms: float, idle_s: float, keep_alive_s: float):
+    print(f'{calls} calls, load {load_ms:.0f} ms, prompt {prompt_ms:.0f} ms, '
+          f'{token_ms:.0f} ms/token, idle {idle_s:.1f} s, server default keep_alive {keep_alive_s:.1f} s')
+    print(f"{'mode':>9} {'first ms':>9} {'mean ms':>9} {'p50 ms':>9} {'tokens':>8} {'loads':>6}")
+
+    from benchmarks import fake_ollama
+    fake_ollama.DEFAULT_KEEP_ALIVE_SECONDS = keep_alive_s
+
+    # Baseline: previous call pattern
+    server = start_server(0, load_ms, prompt_ms, token_ms)
+    host = f'http://127.0.0.1:{server.server_address[1]}'
+    client = ollama.Client(host=host)
+    fake = server.fake
+    latencies = _measure(
+        lambda: client.generate(model=Config.OLLAMA_MODEL, prompt=BASELINE_PROMPT),
+        calls, idle_s
+    )
+    _report('baseline', latencies, fake, 0, 0, calls)
+    server.shutdown()
+
+    # Tuned LlmMatcher against a fresh (unloaded) server
+    server = start_server(0, load_ms, prompt_ms, token_ms)
+    Config.OLLAMA_HOST = f'http://127.0.0.1:{server.server_address[1]}'
+    from app.matching.llm_matcher import LlmMatcher
+    matcher = LlmMatcher()
+    fake = server.fake
+    matcher.warm_up()
+    tokens_before, loads_before = fake.tokens_generated, fake.loads
+    latencies = _measure(lambda: matcher.llm_match(SOURCE, TARGET), calls, idle_s)
+    _report('tuned', latencies, fake, tokens_before, loads_before, calls)
+    print(f'(tuned warm-up load happened before the first call: {loads_before} load)')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=10)
+    parser.add_argument('--load-ms', type=float, default=1500)
+    parser.add_argument('--prompt-ms', type=float, default=60)
+    parser.add_argument('--token-ms', type=float, default=20)
+    parser.add_argument('--idle-s', type=float, default=0.0,
+                        help='Pause between calls (exceed --keep-alive-s to show unloads)')
+    parser.add_argument('--keep-alive-s', type=float, default=300,
+                        help="Fake server's default keep_alive when a request sets none")
+    args = parser.parse_args()
+    run(args.calls, args.load_ms, args.prompt_ms, args.token_ms, args.idle_s, args.keep_alive_s)
@@ -0,0 +1,399 @@
+"""
+HTTP load test for the API with configurable traffic mixes
+
+Replays a weighted mix of /match (one scenario per matching phase),
+POST /identities, listing and /stats requests at a fixed arrival rate
+for each --rps step, then reports per endpoint throughput, latency
+percentiles, error rate and the first step at which it saturated.
+
+By default the app is served in-process on top of an in-memory Supabase
+stand-in (benchmarks/fake_supabase.py) and a fake Ollama server
+(benchmarks/fake_ollama.py); --url points it at a running server instead.
+
+Arrivals are open-loop: requests are sent on schedule whether or not
+earlier ones finished, and latency is measured from the scheduled send
+time, so queueing inside an overloaded server shows up in the numbers.
+
+Usage:
+    python -m benchmarks.load_test [--mix default] [--rps 5 10 20 40] [--duration 10]
+    python -m benchmarks.load_test --mix match_deterministic=3,stats=1 --json results.json
+    python -m benchmarks.load_test --url http://localhost:5000 --mix read_heavy
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import string
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+API_PREFIX = '/api/v1'
+
+MIXES = {
+    'default': {
+        'match_deterministic': 20, 'match_fuzzy': 15, 'match_llm': 5,
+        'create_identity': 10, 'list_profiles': 15, 'list_identities': 10,
+        'list_candidates': 10, 'stats': 15,
+    },
+    'match_heavy': {
+        'match_deterministic': 40, 'match_fuzzy': 30, 'match_llm': 10,
+        'create_identity': 10, 'stats': 10,
+    },
+    'read_heavy': {
+        'list_profiles': 30, 'list_identities': 20, 'list_candidates': 20,
+        'stats': 20, 'match_deterministic': 10,
+    },
+}
+
+# A step is saturated once an endpoint falls this far behind its offered
+# rate, fails this often, or its p95 grows this much over the first step
+MIN_THROUGHPUT_RATIO = 0.9
+MAX_ERROR_RATE = 0.01
+MAX_P95_GROWTH = 3.0
+MIN_RATE_SAMPLES = 5
+
+
+class Scenario:
+    """One request template of the mix"""
+
+    def __init__(self, name: str, method: str, path: str, expected: Tuple[int, ...],
+                 body: Optional[Callable[[random.Random, 'LoadContext'], Dict[str, Any]]] = None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.expected = expected
+        self.body = body
+
+
+class LoadContext:
+    """Identities sampled from the target, used to build request bodies"""
+
+    def __init__(self, identities: List[Dict[str, Any]], llm_deadline_ms: float):
+        self.identities = identities
+        self.fuzzy_identities = [
+            i for i in identities if i.get('platform') in ('dashboard', 'instagram')
+        ] or identities
+        self.llm_deadline_ms = llm_deadline_ms
+        self.sequence = itertools.count()
+
+
+def _mutate(rng: random.Random, text: str) -> str:
+    """One typo: drop, double or swap a character"""
+    if len(text) < 4:
+        return text + rng.choice(string.ascii_lowercase)
+    i = rng.randrange(1, len(text) - 2)
+    edit = rng.choice(['drop', 'double', 'swap'])
+    if edit == 'drop':
+        return text[:i] + text[i + 1:]
+    if edit == 'double':
+        return text[:i] + text[i] + text[i:]
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def _match_deterministic(rng, ctx):
+    identity = rng.choice(ctx.identities)
+    return {'identifiers': {identity['platform']: identity['identifier']}}
+
+
+def _match_fuzzy(rng, ctx):
+    identity = rng.choice(ctx.fuzzy_identities)
+    return {
+        'identifiers': {identity['platform']: _mutate(rng, identity['identifier'])},
+        'display_name': identity.get('display_name'),
+    }
+
+
+def _match_llm(rng, ctx):
+    # Unrelated handle: misses phases 1 and 2, LLM runs until the deadline
+    handle = ''.join(rng.choice(string.ascii_lowercase + string.digits) for _ in range(14))
+    return {'identifiers': {'dashboard': handle}, 'deadline_ms': ctx.llm_deadline_ms}
+
+
+def _create_identity(rng, ctx):
+    suffix = f'{os.getpid()}_{next(ctx.sequence)}_{rng.randrange(10 ** 6)}'
+    return {
+        'platform': 'dashboard',
+        'identifier': f'loadtest_{suffix}',
+        'display_name': ''.join(rng.choice(string.ascii_lowercase) for _ in range(8)).title(),
+    }
+
+
+SCENARIOS = {
+    s.name: s for s in [
+        Scenario('match_deterministic', 'POST', '/match', (200,), _match_deterministic),
+        Scenario('match_fuzzy', 'POST', '/match', (200,), _match_fuzzy),
+        Scenario('match_llm', 'POST', '/match', (200,), _match_llm),
+        Scenario('create_identity', 'POST', '/identities', (201,), _create_identity),
+        Scenario('list_profiles', 'GET', '/profiles', (200,)),
+        Scenario('list_identities', 'GET', '/identities', (200,)),
+        Scenario('list_candidates', 'GET', '/candidates', (200,)),
+        Scenario('stats', 'GET', '/stats', (200,)),
+    ]
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """A preset name or `scenario=weight,...`"""
+    if spec in MIXES:
+        return MIXES[spec]
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (choose from: {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _request(base_url: str, method: str, path: str, body: Optional[Dict[str, Any]], timeout: float) -> int:
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(
+        base_url + API_PREFIX + path, data=data, method=method,
+        headers={'Content-Type': 'application/json', 'Accept-Encoding': 'gzip, br'}
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples: List[Tuple[float, float, Optional[int], bool]]) -> Dict[str, Any]:
+    """
+    Stats for (scheduled, finished, status, ok) samples.
+
+    Offered rate is measured over the span of send times and throughput
+    over the span of successful completions, so a server that keeps up
+    shows equal rates while one that queues shows completions stretching
+    out behind the sends.
+    """
+    latencies = sorted(finished - scheduled for scheduled, finished, _, _ in samples)
+    sent = sorted(scheduled for scheduled, _, _, _ in samples)
+    done = sorted(finished for _, finished, _, success in samples if success)
+    codes: Dict[str, int] = {}
+    for _, _, status, _ in samples:
+        key = str(status) if status is not None else 'exception'
+        codes[key] = codes.get(key, 0) + 1
+
+    def rate(times: List[float]) -> Optional[float]:
+        if len(times) < 2 or times[-1] <= times[0]:
+            return None
+        return round((len(times) - 1) / (times[-1] - times[0]), 2)
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    errors = len(samples) - len(done)
+    return {
+        'requests': len(samples),
+        'ok': len(done),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'offered_rps': rate(sent),
+        'throughput_rps': rate(done),
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+        'status_codes': codes,
+    }
+
+
+def saturation_reason(stats: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not stats['requests']:
+        return None
+    if stats['error_rate'] > MAX_ERROR_RATE:
+        return f"error rate {stats['error_rate']:.1%}"
+    if stats['requests'] >= MIN_RATE_SAMPLES and stats['offered_rps'] and (
+        (stats['throughput_rps'] or 0) < MIN_THROUGHPUT_RATIO * stats['offered_rps']
+    ):
+        return f"throughput {stats['throughput_rps']} < {MIN_THROUGHPUT_RATIO:.0%} of {stats['offered_rps']} rps"
+    if baseline and baseline.get('p95_ms') and stats['p95_ms'] > MAX_P95_GROWTH * baseline['p95_ms']:
+        return f"p95 {stats['p95_ms']} ms > {MAX_P95_GROWTH:g}x first step ({baseline['p95_ms']} ms)"
+    return None
+
+
+def run_step(base_url: str, mix: Dict[str, float], ctx: LoadContext, rps: float, duration: float,
+             concurrency: int, timeout: float, rng: random.Random) -> Dict[str, Any]:
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples: Dict[str, List[Tuple[float, float, Optional[int], bool]]] = {n: [] for n in names}
+    lock = threading.Lock()
+
+    def fire(scenario: Scenario, body, scheduled: float):
+        status = None
+        try:
+            status = _request(base_url, scenario.method, scenario.path, body, timeout)
+        except Exception:
+            pass
+        finished = time.perf_counter()
+        with lock:
+            samples[scenario.name].append((scheduled, finished, status, status in scenario.expected))
+
+    futures = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(int(rps * duration)):
+            scheduled = start + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            scenario = SCENARIOS[rng.choices(names, weights)[0]]
+            body = scenario.body(rng, ctx) if scenario.body else None
+            futures.append(pool.submit(fire, scenario, body, scheduled))
+        wait(futures)
+    elapsed = max(time.perf_counter() - start, duration)
+
+    endpoints = {name: summarize(samples[name]) for name in names}
+    overall = summarize([s for name in names for s in samples[name]])
+    return {'offered_rps': rps, 'duration_s': round(elapsed, 2), 'endpoints': endpoints, 'overall': overall}
+
+
+def find_saturation(steps: List[Dict[str, Any]], names: List[str]) -> Dict[str, Any]:
+    """First step (offered total rps) at which each endpoint, and the whole mix, saturated"""
+    result = {}
+    for name in names + ['overall']:
+        series = [s['overall'] if name == 'overall' else s['endpoints'][name] for s in steps]
+        baseline = next((stats for stats in series if stats['requests']), None)
+        result[name] = None
+        for step, stats in zip(steps, series):
+            reason = saturation_reason(stats, baseline)
+            if reason:
+                result[name] = {'rps': step['offered_rps'], 'reason': reason}
+                break
+    return result
+
+
+def start_local_target(args) -> str:
+    """Serve the app in-process over the in-memory DB and fake Ollama"""
+    import logging
+    from werkzeug.serving import make_server
+
+    from app.config import Config
+    from app.database import SupabaseClient
+    from benchmarks.fake_ollama import start_server
+    from benchmarks.fake_supabase import FakeSupabase, seed_tables
+
+    ollama = start_server(0, args.llm_load_ms, args.llm_prompt_ms, args.llm_token_ms, args.llm_parallel)
+    Config.OLLAMA_HOST = f'http://127.0.0.1:{ollama.server_address[1]}'
+    Config.DATA_VERSION_PATH = os.path.join(tempfile.mkdtemp(prefix='loadtest-'), 'data-version')
+    SupabaseClient._instance = FakeSupabase(seed_tables(args.profiles), latency_ms=args.db_latency_ms)
+
+    from app import create_app
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Let the background LLM warm-up finish before measuring
+    from app.api.routes import llm_matcher
+    llm_matcher.warm_up()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def load_context(base_url: str, llm_deadline_ms: float) -> LoadContext:
+    req = urllib.request.Request(base_url + API_PREFIX + '/identities')
+    with urllib.request.urlopen(req, timeout=60) as response:
+        identities = json.loads(response.read()).get('data') or []
+    identities = [i for i in identities if i.get('platform') and i.get('identifier')]
+    if not identities:
+        raise SystemExit('Target has no identities to build /match requests from')
+    return LoadContext(identities, llm_deadline_ms)
+
+
+def print_report(steps: List[Dict[str, Any]], saturation: Dict[str, Any], names: List[str]):
+    for step in steps:
+        print(f"\n== offered {step['offered_rps']:g} rps over {step['duration_s']} s")
+        print(f"{'endpoint':<20} {'req':>5} {'rps':>7} {'err%':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name in names + ['overall']:
+            stats = step['overall'] if name == 'overall' else step['endpoints'][name]
+            if not stats['requests']:
+                continue
+            print(f"{name:<20} {stats['requests']:>5} {stats['throughput_rps'] or 0:>7.1f} "
+                  f"{stats['error_rate'] * 100:>6.1f} {stats['p50_ms']:>8.1f} "
+                  f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}")
+
+    print('\n== saturation point (offered rps)')
+    for name, point in saturation.items():
+        print(f"{name:<20} {'not reached' if point is None else point['rps']:>12}"
+              + (f"  {point['reason']}" if point else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP load test with configurable traffic mixes')
+    parser.add_argument('--url', help='Target server (default: in-process app on stand-in DB and fake Ollama)')
+    parser.add_argument('--mix', default='default',
+                        help=f"Preset ({', '.join(MIXES)}) or scenario=weight,... ({', '.join(SCENARIOS)})")
+    parser.add_argument('--rps', type=float, nargs='+', default=[5, 10, 20, 40], help='Offered rate per step')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per step')
+    parser.add_argument('--concurrency', type=int, default=64, help='Max in-flight requests')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--llm-deadline-ms', type=float, default=1500, help='deadline_ms of match_llm requests')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', dest='json_path', help="Write results as JSON to this path ('-' for stdout)")
+    local = parser.add_argument_group('in-process target')
+    local.add_argument('--profiles', type=int, default=1000, help='Seeded profiles')
+    local.add_argument('--db-latency-ms', type=float, default=2, help='Simulated round trip per query')
+    local.add_argument('--llm-load-ms', type=float, default=1500)
+    local.add_argument('--llm-prompt-ms', type=float, default=40)
+    local.add_argument('--llm-token-ms', type=float, default=8)
+    local.add_argument('--llm-parallel', type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    names = list(mix)
+
+    base_url = args.url.rstrip('/') if args.url else start_local_target(args)
+    ctx = load_context(base_url, args.llm_deadline_ms)
+    rng = random.Random(args.seed)
+
+    out = sys.stderr if args.json_path == '-' else sys.stdout
+    steps = []
+    for rps in args.rps:
+        print(f'running {rps:g} rps for {args.duration:g} s...', file=out)
+        steps.append(run_step(base_url, mix, ctx, rps, args.duration, args.concurrency, args.timeout, rng))
+    saturation = find_saturation(steps, names)
+
+    if args.json_path != '-':
+        print_report(steps, saturation, names)
+
+    if args.json_path:
+        results = {
+            'target': args.url or 'in-process',
+            'mix': mix,
+            'duration_s': args.duration,
+            'concurrency': args.concurrency,
+            'steps': steps,
+            'saturation': saturation,
+        }
+        if args.json_path == '-':
+            json.dump(results, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json_path, 'w') as fh:
+                json.dump(results, fh, indent=2)
+            print(f'\nresults written to {args.json_path}')
+
+
+if __name__ == '__main__':
+    main()
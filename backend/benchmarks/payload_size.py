@@ -0,0 +1,70 @@
+"""
+Payload-size and serialization benchmark for listing responses
+
+Builds synthetic /profiles payloads (profiles with embedded identities)
+and reports encoder time and wire size for each encoding.
+
+Usage: python -m benchmarks.payload_size [--profiles 1000 5000] [--identities 4]
+"""
+import argparse
+import gzip
+import json
+import time
+
+from app.compression import brotli
+from app.config import Config
+from app.json_provider import orjson
+from benchmarks.fake_supabase import seed_tables
+
+def build_payload(n_profiles: int, identities_per_profile: int, seed: int = 7) -> dict:
+    """Synthetic /profiles response body"""
+    tables = seed_tables(n_profiles, seed, candidate_ratio=0, identities_per_profile=identities_per_profile)
+    linked = {}
+    for identity in tables['platform_identities']:
+        linked.setdefault(identity['profile_id'], []).append(identity)
+    profiles = [
+        {**profile, 'platform_identities': linked.get(profile['id'], [])}
+        for profile in tables['unified_profiles']
+    ]
+    return {'success': True, 'data': profiles, 'count': len(profiles)}
+
+
+def _timed(fn, repeat: int = 5):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def run(profile_counts, identities_per_profile: int):
+    print(f"{'profiles':>9} {'encoder':>9} {'encode ms':>10} {'raw KB':>9} "
+          f"{'gzip KB':>9} {'gzip ms':>8} {'br KB':>8} {'br ms':>7}")
+
+    for n_profiles in profile_counts:
+        payload = build_payload(n_profiles, identities_per_profile)
+        encoders = [('json', lambda: json.dumps(payload, separators=(',', ':')).encode())]
+        if orjson is not None:
+            encoders.append(('orjson', lambda: orjson.dumps(payload)))
+
+        for name, encode in encoders:
+            body, encode_ms = _timed(encode)
+            gz, gzip_ms = _timed(lambda: gzip.compress(body, compresslevel=Config.GZIP_LEVEL))
+            if brotli is not None:
+                br, br_ms = _timed(lambda: brotli.compress(body, quality=Config.BROTLI_QUALITY))
+                br_kb = f'{len(br) / 1024:8.1f}'
+                br_ms = f'{br_ms:7.1f}'
+            else:
+                br_kb, br_ms = f"{'n/a':>8}", f"{'n/a':>7}"
+            print(f'{n_profiles:>9} {name:>9} {encode_ms:10.1f} {len(body) / 1024:9.1f} '
+                  f'{len(gz) / 1024:9.1f} {gzip_ms:8.1f} {br_kb} {br_ms}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--profiles', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--identities', type=int, default=4)
+    args = parser.parse_args()
+    run(args.profiles, args.identities)
@@ -0,0 +1,56 @@
+"""
+Sharded fuzzy scoring benchmark
+
+Scores one query against a synthetic candidate set in-process and with
+ShardedScorer at increasing shard counts, and reports the speedup. Both
+sides use the cascaded scorer at the same threshold.
+
+Usage: python -m benchmarks.sharded_fuzzy [--rows 100000] [--shards 1 2 4 8]
+"""
+import argparse
+import os
+import time
+
+from app.matching.scoring import score_identity
+from app.matching.sharded import ShardedScorer
+from benchmarks.fake_supabase import candidate_rows
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(n_rows: int, shard_counts, repeat: int, threshold: float):
+    rows = candidate_rows(n_rows)
+    query = ('sarajohnson', 'Sara Johnson')
+
+    def single():
+        return [r['id'] for r in rows if score_identity(r, *query, threshold) >= threshold]
+
+    baseline = _best_of(single, repeat)
+    print(f'{n_rows} candidates, {os.cpu_count()} CPUs')
+    print(f"{'shards':>7} {'ms':>9} {'speedup':>8}")
+    print(f"{'inline':>7} {baseline * 1000:9.1f} {1.0:8.2f}")
+
+    for shards in shard_counts:
+        scorer = ShardedScorer(shards)
+        scorer.load(rows, version=n_rows)
+        scorer.score(*query, threshold, 200)  # warm up the workers
+        elapsed = _best_of(lambda: scorer.score(*query, threshold, 200), repeat)
+        scorer.close()
+        print(f'{shards:>7} {elapsed * 1000:9.1f} {baseline / elapsed:8.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threshold', type=float, default=0.65)
+    args = parser.parse_args()
+    run(args.rows, args.shards, args.repeat, args.threshold)
@@ -0,0 +1,23 @@
+"""
+Gunicorn configuration (loaded automatically from the working directory)
+"""
+
+
+def on_starting(server):
+    """Build the shared identity snapshot once in the master, before workers fork"""
+    from app.config import Config
+
+    if not Config.SNAPSHOT_DIR:
+        return
+
+    from app.database import SupabaseClient
+    from app.matching.snapshot import build_from_database
+
+    try:
+        path = build_from_database()
+        server.log.info(f"Published identity snapshot {path}")
+    except Exception as e:
+        server.log.error(f"Error building identity snapshot: {str(e)}")
+    finally:
+        # Do not hand the master's connection pool to forked workers
+        SupabaseClient._instance = None
@@ -0,0 +1,43 @@
+-- Columns used by profile merges and candidate store delta syncs
+--
+-- unified_profiles.merged_into: forwarding pointer of a merged profile
+--   (profile_merger, GET /profiles/<id>).
+-- created_at / updated_at on platform_identities and unified_profiles:
+--   delta-sync watermarks (CANDIDATE_STORE). The trigger advances
+--   updated_at on every update, including writes made outside the API.
+--
+-- Idempotent: safe to run on a database that already has any of these.
+
+alter table unified_profiles
+    add column if not exists merged_into integer references unified_profiles (id);
+
+alter table unified_profiles
+    add column if not exists created_at timestamptz not null default now(),
+    add column if not exists updated_at timestamptz not null default now();
+
+alter table platform_identities
+    add column if not exists created_at timestamptz not null default now(),
+    add column if not exists updated_at timestamptz not null default now();
+
+create or replace function set_updated_at() returns trigger as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists unified_profiles_updated_at on unified_profiles;
+create trigger unified_profiles_updated_at
+    before update on unified_profiles
+    for each row execute function set_updated_at();
+
+drop trigger if exists platform_identities_updated_at on platform_identities;
+create trigger platform_identities_updated_at
+    before update on platform_identities
+    for each row execute function set_updated_at();
+
+-- Delta reads filter on these
+create index if not exists platform_identities_updated_at_idx on platform_identities (updated_at);
+create index if not exists platform_identities_created_at_idx on platform_identities (created_at);
+create index if not exists unified_profiles_updated_at_idx on unified_profiles (updated_at);
+create index if not exists unified_profiles_created_at_idx on unified_profiles (created_at);
@@ -40,6 +40,7 @@ export const apiService = {
   // Profiles
   getProfiles: () => api.get('/profiles'),
   getProfile: (id) => api.get(`/profiles/${id}`),
+  getProfilesByIds: (ids) => api.get(`/profiles?ids=${ids.join(',')}`),
   createProfile: (data) => api.post('/profiles', data),
 
   // Identities
@@ -48,11 +49,13 @@ export const apiService = {
 
   // Matching
   findMatches: (identifiers) => api.post('/match', { identifiers }),
+  getAdmissionStats: () => api.get('/admission'),
 
   // Candidates
   getCandidates: (status = 'pending') => api.get(`/candidates?status=${status}`),
   approveCandidate: (id, reviewedBy = 'admin') => api.post(`/candidates/${id}/approve`, { reviewed_by: reviewedBy }),
   rejectCandidate: (id, reviewedBy = 'admin') => api.post(`/candidates/${id}/reject`, { reviewed_by: reviewedBy }),
+  bulkReviewCandidates: (action, selection, reviewedBy = 'admin') => api.post('/candidates/bulk', { action, ...selection, reviewed_by: reviewedBy }),
 
   // Stats
   getStats: () => api.get('/stats'),